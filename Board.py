@@ -1,6 +1,8 @@
-import pygame
 import os
 import sys
+from collections import OrderedDict
+from zobrist import PIECE_KEYS, CASTLING_KEYS, BLACK_TO_MOVE_KEY, en_passant_key, compute_hash
+from evaluation import MG_TABLE, EG_TABLE, PHASE, compute_scores
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -12,15 +14,132 @@ def resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
-class CastleRights:
-    def __init__(self, wks, wqs, bks, bqs):
-        self.wks = wks  # White king side
-        self.wqs = wqs  # White queen side
-        self.bks = bks  # Black king side
-        self.bqs = bqs  # Black queen side
+ORTHOGONAL = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+DIAGONAL = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+DIRECTIONS = ORTHOGONAL + DIAGONAL  # Indices 0-3 orthogonal, 4-7 diagonal
+OPPOSITE = [2, 3, 0, 1, 7, 6, 5, 4]  # DIRECTIONS[OPPOSITE[j]] == -DIRECTIONS[j]
+DIRECTION_INDEX = {d: j for j, d in enumerate(DIRECTIONS)}
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def _targets(row, col, offsets):
+    return [(row + dr, col + dc, (row + dr) * 8 + col + dc) for dr, dc in offsets
+            if 0 <= row + dr < 8 and 0 <= col + dc < 8]
+
+
+def _ray(row, col, dr, dc):
+    return [(row + dr * i, col + dc * i, (row + dr * i) * 8 + col + dc * i) for i in range(1, 8)
+            if 0 <= row + dr * i < 8 and 0 <= col + dc * i < 8]
+
+
+# Per-square tables indexed by row * 8 + col. Entries are (row, col, square)
+# so the move code never has to bounds-check or do index arithmetic.
+KNIGHT_TARGETS = [_targets(sq // 8, sq % 8, KNIGHT_OFFSETS) for sq in range(64)]
+KING_TARGETS = [_targets(sq // 8, sq % 8, KING_OFFSETS) for sq in range(64)]
+RAYS = [[_ray(sq // 8, sq % 8, dr, dc) for dr, dc in DIRECTIONS] for sq in range(64)]  # RAYS[sq][direction]
+PAWN_ATTACKS = {  # Squares a pawn of that colour on sq attacks
+    'w': [_targets(sq // 8, sq % 8, [(-1, -1), (-1, 1)]) for sq in range(64)],
+    'b': [_targets(sq // 8, sq % 8, [(1, -1), (1, 1)]) for sq in range(64)],
+}
+SLIDER_DIRECTIONS = {'R': range(0, 4), 'B': range(4, 8), 'Q': range(0, 8)}
+
+COORDS = [(sq // 8, sq % 8) for sq in range(64)]  # Shared (row, col) tuples, never rebuilt
+
+# Castling rights as a 4-bit mask
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+ALL_CASTLING = 15
+# Rights that survive a move from or onto each square (king and rook homes)
+CASTLING_KEEP = [ALL_CASTLING] * 64
+CASTLING_KEEP[0] = ALL_CASTLING & ~BLACK_QUEENSIDE
+CASTLING_KEEP[7] = ALL_CASTLING & ~BLACK_KINGSIDE
+CASTLING_KEEP[4] = ALL_CASTLING & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEEP[56] = ALL_CASTLING & ~WHITE_QUEENSIDE
+CASTLING_KEEP[63] = ALL_CASTLING & ~WHITE_KINGSIDE
+CASTLING_KEEP[60] = ALL_CASTLING & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+
+# 16-bit moves: from (6) | to (6) | flags (4), squares as row * 8 + col
+QUIET, DOUBLE_PUSH, KING_CASTLE, QUEEN_CASTLE, CAPTURE, EN_PASSANT = 0, 1, 2, 3, 4, 5
+PROMOTION = 8  # + 4 if capturing, + index into PROMOTION_ORDER
+PROMOTION_ORDER = 'NBRQ'
+
+
+def encode_move(start_sq, end_sq, flags):
+    return start_sq | (end_sq << 6) | (flags << 12)
+
+
+def decode_move(code):
+    """ 16-bit move -> (start, end, promotion) as used by Board.move """
+    flags = code >> 12
+    return COORDS[code & 63], COORDS[(code >> 6) & 63], PROMOTION_ORDER[flags & 3] if flags & PROMOTION else None
+
+
+def material_draw(white_pieces, black_pieces):
+    """ True if neither side can mate with these non-king pieces (letters like 'B') """
+    # King vs King
+    if len(white_pieces) == 0 and len(black_pieces) == 0:
+        return True
+    
+    # King vs King + Bishop
+    if len(white_pieces) == 0 and len(black_pieces) == 1 and black_pieces[0] == 'B':
+        return True
+    if len(black_pieces) == 0 and len(white_pieces) == 1 and white_pieces[0] == 'B':
+        return True
+    
+    # King vs King + Knight
+    if len(white_pieces) == 0 and len(black_pieces) == 1 and black_pieces[0] == 'N':
+        return True
+    if len(black_pieces) == 0 and len(white_pieces) == 1 and white_pieces[0] == 'N':
+        return True
+    
+    # King + Bishop vs King + Bishop (same color squares)
+    if len(white_pieces) == 1 and white_pieces[0] == 'B' and \
+       len(black_pieces) == 1 and black_pieces[0] == 'B':
+        # This is a simplified check - ideally we'd check if bishops are on same colored squares
+        return True
+    
+    return False
+
+
+class MoveCache:
+    """ Legal moves of recently seen positions, keyed by (zobrist key, side to
+    move) and bounded to `size` entries, least recently used dropped first """
+
+    def __init__(self, size=256):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class UndoRecord:
+    """ What undo_move needs to restore one move. Records are pooled and
+    reused, so do not keep one after its move has been undone. """
+    __slots__ = ('move', 'piece_moved', 'piece_captured', 'castling_rights', 'en_passant_possible',
+                 'halfmove_clock', 'zobrist_key', 'mg_score', 'eg_score', 'phase')
+
+
+# FEN letters <-> piece codes
+FEN_PIECES = {(kind if color == 'w' else kind.lower()): color + kind for color in 'wb' for kind in 'KQRBNP'}
+FEN_LETTERS = {piece: letter for letter, piece in FEN_PIECES.items()}
+FEN_CASTLING = (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 
 class Board:
-    def __init__(self, rows, cols, width, height):
+    def __init__(self, rows, cols, width, height, load_images=False):
         self.ROWS = rows
         self.COLS = cols
         self.WIDTH = width
@@ -29,8 +148,8 @@ class Board:
         self.board = []
         self.create_board()
         
-        self.PIECES = {}
-        self.load_pieces()
+        if load_images: # Sprites otherwise load on the first draw, so rules-only boards never touch pygame
+            self.load_pieces()
         
         self.white_king_location = (7, 4)
         self.black_king_location = (0, 4)
@@ -38,14 +157,226 @@ class Board:
         self.pins = []
         self.checks = []
         self.en_passant_possible = () # (row, col) square where en passant capture is possible
-        self.current_castling_right = CastleRights(True, True, True, True)
-        self.castle_rights_log = [CastleRights(True, True, True, True)]
-        self.move_log = []  # Store move history for undo
+        self.castling_rights = ALL_CASTLING
+        self.move_log = []  # UndoRecords of the moves played, for undo
+        self._undo_pool = []
+        self.halfmove_clock = 0  # Plies since the last capture or pawn move
+        self.start_ply = 0  # Game ply of the position move_log starts from (for FEN move numbers)
         
         # Track captured pieces
         self.white_captured = []  # Pieces captured by white (black pieces)
         self.black_captured = []  # Pieces captured by black (white pieces)
         
+        # 64-bit position key and evaluation totals, kept up to date by move / undo_move
+        self.zobrist_key = 0
+        self.key_history = []  # zobrist_key after every move, for repetitions
+        self.mg_score = 0  # White minus Black, material + piece-square (middlegame)
+        self.eg_score = 0  # Same for the endgame
+        self.phase = 0     # Non-pawn material left, 24 at the start
+        self._status = None  # (turn, game_status) for the current position
+        self.move_cache = MoveCache()
+        # The first board of each class works out the start position's derived
+        # state; later ones copy it
+        start_state = type(self).__dict__.get('_start_state')
+        if start_state is None:
+            self.refresh_incremental_state('w')
+            type(self)._start_state = self.derived_state()
+        else:
+            self.restore_derived_state(start_state)
+            self.key_history = [self.zobrist_key]
+        
+    def refresh_incremental_state(self, turn):
+        # Recompute everything move / undo_move maintain incrementally, after
+        # the position was set up directly (e.g. from a FEN)
+        self.zobrist_key = compute_hash(self, turn)
+        self.key_history = [self.zobrist_key]
+        self.mg_score, self.eg_score, self.phase = compute_scores(self)
+        self.sync_attack_maps()
+        self._status = None
+        self.move_cache.clear()
+
+    def derived_state(self):
+        """ Copy of the state refresh_incremental_state computes from the squares """
+        return (self.zobrist_key, self.mg_score, self.eg_score, self.phase,
+                {color: counts[:] for color, counts in self.attack_counts.items()})
+
+    def restore_derived_state(self, state):
+        self.zobrist_key, self.mg_score, self.eg_score, self.phase, attack_counts = state
+        self.attack_counts = {color: counts[:] for color, counts in attack_counts.items()}
+
+    @classmethod
+    def from_fen(cls, fen, width=800, height=800, load_images=False):
+        """ New board set up from `fen` (no sprites unless asked for); returns (board, turn) """
+        board = cls(8, 8, width, height, load_images=load_images)
+        turn = board.set_fen(fen)
+        return board, turn
+
+    def set_fen(self, fen):
+        """ Replace the position (and history) with `fen`; returns the side to move.
+        The halfmove clock and move number fields are optional, as in EPD. """
+        fields = fen.split()
+        ranks = fields[0].split('/') if fields else []
+        if len(ranks) != 8 or len(fields) > 6:
+            raise ValueError(f"FEN needs 8 ranks and at most 6 fields: {fen!r}")
+        # Parsed into new rows so a bad FEN leaves the current position untouched
+        rows = []
+        kings = {'wK': [], 'bK': []}
+        for row, rank in enumerate(ranks):
+            squares = ["--"] * 8
+            col = 0
+            for ch in rank:
+                if ch.isdigit():
+                    col += int(ch)
+                    continue
+                piece = FEN_PIECES.get(ch)
+                if piece is None or col >= 8:
+                    raise ValueError(f"Bad FEN rank {rank!r}: {fen!r}")
+                if piece[1] == 'P' and row in (0, 7):
+                    raise ValueError(f"Pawn on the first or last rank: {fen!r}")
+                squares[col] = piece
+                if piece in kings:
+                    kings[piece].append(COORDS[row * 8 + col])
+                col += 1
+            if col != 8:
+                raise ValueError(f"Bad FEN rank {rank!r}: {fen!r}")
+            rows.append(squares)
+        if len(kings['wK']) != 1 or len(kings['bK']) != 1:
+            raise ValueError(f"FEN needs one king per side: {fen!r}")
+        turn = fields[1] if len(fields) > 1 else 'w'
+        if turn not in ('w', 'b'):
+            raise ValueError(f"Bad side to move {turn!r}: {fen!r}")
+        castling = fields[2] if len(fields) > 2 else "-"
+        if castling != "-" and not set(castling) <= {ch for ch, _ in FEN_CASTLING}:
+            raise ValueError(f"Bad castling field {castling!r}: {fen!r}")
+        en_passant = fields[3] if len(fields) > 3 else "-"
+        # The square passed over, on the 6th rank when White is to move and the 3rd for Black
+        if en_passant != "-" and (len(en_passant) != 2 or en_passant[0] not in "abcdefgh" or
+                                  en_passant[1] != ('6' if turn == 'w' else '3')):
+            raise ValueError(f"Bad en passant square {en_passant!r}: {fen!r}")
+        if en_passant != "-":
+            # Only after a double push: the square passed over and the one the
+            # pawn left are empty, and the opponent's pawn stands in front
+            ep_row, ep_col = 8 - int(en_passant[1]), "abcdefgh".index(en_passant[0])
+            step = 1 if turn == 'w' else -1
+            if rows[ep_row][ep_col] != "--" or rows[ep_row - step][ep_col] != "--" or \
+               rows[ep_row + step][ep_col] != ('b' if turn == 'w' else 'w') + 'P':
+                raise ValueError(f"En passant square {en_passant!r} without a double push: {fen!r}")
+        counters = fields[4:]
+        if not all(field.isdigit() for field in counters):
+            raise ValueError(f"Bad move counters {' '.join(counters)!r}: {fen!r}")
+        # The side that just moved cannot have left its king in check
+        other = 'b' if turn == 'w' else 'w'
+        previous = self.board
+        self.board = rows
+        if self.scan_square_attacked(*kings[other + 'K'][0], turn):
+            self.board = previous
+            raise ValueError(f"Side not to move is in check: {fen!r}")
+
+        self.white_king_location = kings['wK'][0]
+        self.black_king_location = kings['bK'][0]
+        self.castling_rights = 0
+        for ch, right in FEN_CASTLING:
+            if ch in castling:
+                self.castling_rights |= right
+        if en_passant == "-":
+            self.en_passant_possible = ()
+        else:
+            self.en_passant_possible = (8 - int(en_passant[1]), ord(en_passant[0]) - ord('a'))
+        self.halfmove_clock = int(counters[0]) if counters else 0
+        fullmove = max(int(counters[1]), 1) if len(counters) > 1 else 1
+        self.start_ply = 2 * (fullmove - 1) + (1 if turn == 'b' else 0)
+
+        self.move_log = []
+        self.white_captured = []
+        self.black_captured = []
+        self.refresh_incremental_state(turn)
+        return turn
+
+    def to_fen(self, turn):
+        """ FEN of the current position with `turn` to move """
+        ranks = []
+        for squares in self.board:
+            rank = ""
+            empty = 0
+            for piece in squares:
+                if piece == "--":
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += FEN_LETTERS[piece]
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        castling = "".join(ch for ch, right in FEN_CASTLING if self.castling_rights & right) or "-"
+        if self.en_passant_possible:
+            row, col = self.en_passant_possible
+            en_passant = "abcdefgh"[col] + str(8 - row)
+        else:
+            en_passant = "-"
+        fullmove = (self.start_ply + len(self.move_log)) // 2 + 1
+        return f"{'/'.join(ranks)} {turn} {castling} {en_passant} {self.halfmove_clock} {fullmove}"
+
+    def sync_attack_maps(self):
+        # Rebuild the attack counts from the 8x8 list.
+        # attack_counts[color][row * 8 + col]: how many `color` pieces attack the square
+        self.attack_counts = {'w': [0] * 64, 'b': [0] * 64}
+        for row in range(8):
+            for col in range(8):
+                if self.board[row][col] != "--":
+                    self._add_attacks(row, col, self.board[row][col], 1)
+
+    def set_square(self, row, col, piece):
+        # Every change to the position goes through here ("--" empties the
+        # square) so the attack maps stay exact
+        old = self.board[row][col]
+        if old != "--":
+            self._add_attacks(row, col, old, -1)
+        if (old == "--") != (piece == "--"):
+            # Sliders looking through this square gain or lose the ray behind it
+            self._update_rays_through(row, col, 1 if piece == "--" else -1)
+        self.board[row][col] = piece
+        if piece != "--":
+            self._add_attacks(row, col, piece, 1)
+
+    def _add_attacks(self, row, col, piece, delta):
+        counts = self.attack_counts[piece[0]]
+        kind = piece[1]
+        sq = row * 8 + col
+        if kind == 'P':
+            for _, _, target in PAWN_ATTACKS[piece[0]][sq]:
+                counts[target] += delta
+        elif kind == 'N' or kind == 'K':
+            for _, _, target in (KNIGHT_TARGETS if kind == 'N' else KING_TARGETS)[sq]:
+                counts[target] += delta
+        else:
+            board = self.board
+            rays = RAYS[sq]
+            for j in SLIDER_DIRECTIONS[kind]:
+                for r, c, target in rays[j]:
+                    counts[target] += delta
+                    if board[r][c] != "--":
+                        break
+
+    def _update_rays_through(self, row, col, delta):
+        board = self.board
+        rays = RAYS[row * 8 + col]
+        for j in range(8):
+            # First piece behind the square, looking against this direction
+            slider = "--"
+            for r, c, _ in rays[OPPOSITE[j]]:
+                if board[r][c] != "--":
+                    slider = board[r][c]
+                    break
+            if slider == "--" or (slider[1] != 'Q' and slider[1] != ('R' if j < 4 else 'B')):
+                continue
+            counts = self.attack_counts[slider[0]]
+            for r, c, target in rays[j]:
+                counts[target] += delta
+                if board[r][c] != "--":
+                    break
+
     def create_board(self):
         self.board = [
             ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
@@ -58,679 +389,612 @@ class Board:
             ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
         ]
 
+    @property
+    def PIECES(self):
+        # Sprites by piece code, loaded on first use and shared between boards
+        from render import piece_sprites
+        return piece_sprites(self.SQ_SIZE)
+
     def load_pieces(self):
-        # Use resource_path for bundled executable
-        sprite_sheet_path = resource_path('chess_pieces_16x16_onebit/pieces.png')
-        sprite_sheet = pygame.image.load(sprite_sheet_path).convert_alpha()
-        
-        # Dynamically calculate sprite size from image dimensions
-        sheet_width, sheet_height = sprite_sheet.get_size()
-        SPRITE_W = sheet_width // 6
-        SPRITE_H = sheet_height // 2
-        
-        piece_order = ["K", "Q", "B", "R", "N", "P"]
-        scale_size = (self.SQ_SIZE, self.SQ_SIZE)
-        
-        self.PIECES = {}
-        
-        self.PIECES = {}
-        for idx, piece in enumerate(piece_order):
-            # White pieces (top row)
-            rect_w = pygame.Rect(idx * SPRITE_W, 0, SPRITE_W, SPRITE_H)
-            image_w = sprite_sheet.subsurface(rect_w).copy()
-            image_w = pygame.transform.smoothscale(image_w, (self.SQ_SIZE, self.SQ_SIZE))
-            self.PIECES['w' + piece] = image_w
-            
-            # Black pieces (bottom row)
-            rect_b = pygame.Rect(idx * SPRITE_W, SPRITE_H, SPRITE_W, SPRITE_H)
-            image_b = sprite_sheet.subsurface(rect_b).copy()
-            image_b = pygame.transform.smoothscale(image_b, (self.SQ_SIZE, self.SQ_SIZE))
-            self.PIECES['b' + piece] = image_b
-
-    def draw_squares(self, win):
-        win.fill((255, 255, 255))
-        Light = (240, 217, 181)
-        Dark = (181, 136, 99)
-        
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                color = Light if (row + col) % 2 == 0 else Dark
-                pygame.draw.rect(
-                    win,
-                    color,
-                    (col * self.SQ_SIZE, row * self.SQ_SIZE, self.SQ_SIZE, self.SQ_SIZE)
-                )
-
-    def draw_pieces(self, win):
-        for row in range(self.ROWS):
-            for col in range(self.COLS):
-                piece = self.board[row][col]
-                if piece != "--":
-                    if piece in self.PIECES:
-                        win.blit(self.PIECES[piece], (col * self.SQ_SIZE, row * self.SQ_SIZE))
-
-    def draw_highlight(self, win, selected):
-        if selected:
-            row, col = selected
-            pygame.draw.rect(
-                win,
-                (0, 255, 0), # Green highlight
-                (col * self.SQ_SIZE, row * self.SQ_SIZE, self.SQ_SIZE, self.SQ_SIZE),
-                4 # Thickness
-            )
-
-    def draw_valid_moves(self, win, moves):
-        if not moves:
-            return
-            
-        for row, col in moves:
-            center_x = col * self.SQ_SIZE + self.SQ_SIZE // 2
-            center_y = row * self.SQ_SIZE + self.SQ_SIZE // 2
-            radius = 10 # Size of the dot
-            
-            # Create a transparent surface for the dot
-            target_surface = pygame.Surface((self.SQ_SIZE, self.SQ_SIZE), pygame.SRCALPHA)
-            pygame.draw.circle(target_surface, (128, 128, 128, 150), (self.SQ_SIZE//2, self.SQ_SIZE//2), radius)
-            win.blit(target_surface, (col * self.SQ_SIZE, row * self.SQ_SIZE))
+        """ Load the sprites now rather than on the first draw """
+        return self.PIECES
 
     def draw(self, win, selected=None, valid_moves=None):
-        self.draw_squares(win)
-        self.draw_highlight(win, selected)
-        self.draw_pieces(win)
-        self.draw_valid_moves(win, valid_moves)
+        from render import draw_board
+        draw_board(win, self, selected, valid_moves)
 
-    def move(self, start, end):
+    def move(self, start, end, promotion='Q'):
         start_row, start_col = start
         end_row, end_col = end
+        start_sq = start_row * 8 + start_col
+        end_sq = end_row * 8 + end_col
         
         piece_moved = self.board[start_row][start_col]
         piece_captured = self.board[end_row][end_col]
+        mover = piece_moved[0]
+        flags = QUIET
         
         # Track captured piece
         if piece_captured != "--":
-            if piece_moved[0] == 'w':
+            flags = CAPTURE
+            if mover == 'w':
                 self.white_captured.append(piece_captured[1])
             else:
                 self.black_captured.append(piece_captured[1])
         
-        # Store move for undo
-        move_record = {
-            'start': start,
-            'end': end,
-            'piece_moved': piece_moved,
-            'piece_captured': piece_captured,
-            'en_passant_possible': self.en_passant_possible,
-            'castling_rights': CastleRights(self.current_castling_right.wks, self.current_castling_right.wqs,
-                                           self.current_castling_right.bks, self.current_castling_right.bqs),
-            'is_castle': False,
-            'is_en_passant': False,
-            'is_promotion': False,
-            'white_king_loc': self.white_king_location,
-            'black_king_loc': self.black_king_location
-        }
-        
-        self.board[end_row][end_col] = piece_moved
-        self.board[start_row][start_col] = "--"
+        # Store what undo needs in a pooled record (no allocation once warmed up)
+        depth = len(self.move_log)
+        if depth == len(self._undo_pool):
+            self._undo_pool.append(UndoRecord())
+        record = self._undo_pool[depth]
+        record.piece_moved = piece_moved
+        record.piece_captured = piece_captured
+        record.castling_rights = self.castling_rights
+        record.en_passant_possible = self.en_passant_possible
+        record.halfmove_clock = self.halfmove_clock
+        record.zobrist_key = self.zobrist_key
+        record.mg_score = self.mg_score
+        record.eg_score = self.eg_score
+        record.phase = self.phase
+        
+        # Hash out what this move can change: moving piece, capture, en passant file, castling rights
+        key = self.zobrist_key ^ en_passant_key(self, mover)
+        key ^= CASTLING_KEYS[self.castling_rights]
+        key ^= PIECE_KEYS[piece_moved][start_sq]
+        mg = self.mg_score - MG_TABLE[piece_moved][start_sq]
+        eg = self.eg_score - EG_TABLE[piece_moved][start_sq]
+        if piece_captured != "--":
+            key ^= PIECE_KEYS[piece_captured][end_sq]
+            mg -= MG_TABLE[piece_captured][end_sq]
+            eg -= EG_TABLE[piece_captured][end_sq]
+            self.phase -= PHASE[piece_captured]
+        
+        # Pawn Promotion (Auto-Queen unless another piece is requested)
+        piece_placed = piece_moved
+        if piece_moved[1] == 'P':
+            if (mover == 'w' and end_row == 0) or (mover == 'b' and end_row == 7):
+                piece_placed = mover + promotion
+                self.phase += PHASE[piece_placed]
+                flags |= PROMOTION + PROMOTION_ORDER.index(promotion)
+        
+        self.set_square(start_row, start_col, "--")
+        self.set_square(end_row, end_col, piece_placed)
         
         # Update King Location
         if piece_moved == 'wK':
-            self.white_king_location = (end_row, end_col)
+            self.white_king_location = COORDS[end_sq]
         elif piece_moved == 'bK':
-            self.black_king_location = (end_row, end_col)
-            
-        # Pawn Promotion (Auto-Queen)
+            self.black_king_location = COORDS[end_sq]
+        
         if piece_moved[1] == 'P':
-            if piece_moved[0] == 'w' and end_row == 0:
-                self.board[end_row][end_col] = 'wQ'
-                move_record['is_promotion'] = True
-            elif piece_moved[0] == 'b' and end_row == 7:
-                self.board[end_row][end_col] = 'bQ'
-                move_record['is_promotion'] = True
-                
-        # En Passant Move
-        if piece_moved[1] == 'P' and (end_row, end_col) == self.en_passant_possible:
-            self.board[start_row][end_col] = "--" # Capture the pawn
-            move_record['is_en_passant'] = True
-            move_record['en_passant_captured_pos'] = (start_row, end_col)
-            
+            if start_col != end_col and piece_captured == "--":
+                # En Passant Move: the captured pawn sits beside the start square
+                captured_pawn = self.board[start_row][end_col]
+                key ^= PIECE_KEYS[captured_pawn][start_row * 8 + end_col]
+                mg -= MG_TABLE[captured_pawn][start_row * 8 + end_col]
+                eg -= EG_TABLE[captured_pawn][start_row * 8 + end_col]
+                self.set_square(start_row, end_col, "--") # Capture the pawn
+                flags = EN_PASSANT
+            elif abs(start_row - end_row) == 2:
+                flags = DOUBLE_PUSH
+        
+        # Captures and pawn moves can never be undone, so they reset the clock
+        if piece_moved[1] == 'P' or flags & CAPTURE:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        
         # Update En Passant Possible
-        if piece_moved[1] == 'P' and abs(start_row - end_row) == 2:
-            self.en_passant_possible = ((start_row + end_row)//2, end_col)
+        if flags == DOUBLE_PUSH:
+            self.en_passant_possible = COORDS[(start_sq + end_sq) // 2]
         else:
             self.en_passant_possible = ()
-            
+        
         # Castle Move
         if piece_moved[1] == 'K' and abs(start_col - end_col) == 2:
-            move_record['is_castle'] = True
+            rook = mover + 'R'
             if end_col == 6: # King Side
-                self.board[end_row][5] = self.board[end_row][7]
-                self.board[end_row][7] = "--"
-                move_record['rook_start'] = (end_row, 7)
-                move_record['rook_end'] = (end_row, 5)
+                flags = KING_CASTLE
+                self.set_square(end_row, 7, "--")
+                self.set_square(end_row, 5, rook)
+                key ^= PIECE_KEYS[rook][end_row * 8 + 7] ^ PIECE_KEYS[rook][end_row * 8 + 5]
+                mg += MG_TABLE[rook][end_row * 8 + 5] - MG_TABLE[rook][end_row * 8 + 7]
+                eg += EG_TABLE[rook][end_row * 8 + 5] - EG_TABLE[rook][end_row * 8 + 7]
             else: # Queen Side
-                self.board[end_row][3] = self.board[end_row][0]
-                self.board[end_row][0] = "--"
-                move_record['rook_start'] = (end_row, 0)
-                move_record['rook_end'] = (end_row, 3)
-                
-        # Update Castling Rights
-        self.update_castle_rights(piece_moved)
-        self.castle_rights_log.append(CastleRights(self.current_castling_right.wks, self.current_castling_right.wqs,
-                                                   self.current_castling_right.bks, self.current_castling_right.bqs))
+                flags = QUEEN_CASTLE
+                self.set_square(end_row, 0, "--")
+                self.set_square(end_row, 3, rook)
+                key ^= PIECE_KEYS[rook][end_row * 8 + 0] ^ PIECE_KEYS[rook][end_row * 8 + 3]
+                mg += MG_TABLE[rook][end_row * 8 + 3] - MG_TABLE[rook][end_row * 8 + 0]
+                eg += EG_TABLE[rook][end_row * 8 + 3] - EG_TABLE[rook][end_row * 8 + 0]
+        
+        # Update Castling Rights: king moves, and moves from or onto a rook's corner
+        self.castling_rights &= CASTLING_KEEP[start_sq] & CASTLING_KEEP[end_sq]
+        
+        # Hash in the new state and flip the side to move
+        key ^= PIECE_KEYS[piece_placed][end_sq]
+        self.mg_score = mg + MG_TABLE[piece_placed][end_sq]
+        self.eg_score = eg + EG_TABLE[piece_placed][end_sq]
+        key ^= CASTLING_KEYS[self.castling_rights]
+        key ^= en_passant_key(self, 'b' if mover == 'w' else 'w')
+        self.zobrist_key = key ^ BLACK_TO_MOVE_KEY
         
         # Add to move log
-        self.move_log.append(move_record)
+        record.move = encode_move(start_sq, end_sq, flags)
+        self.move_log.append(record)
+        self.key_history.append(self.zobrist_key)
+        self._status = None
 
     def undo_move(self):
         if len(self.move_log) == 0:
             return False  # No moves to undo
             
-        move = self.move_log.pop()
+        record = self.move_log.pop()
+        self.key_history.pop()
+        self._status = None
+        code = record.move
+        flags = code >> 12
+        start_row, start_col = COORDS[code & 63]
+        end_row, end_col = COORDS[(code >> 6) & 63]
+        piece_moved = record.piece_moved
+        piece_captured = record.piece_captured
         
-        # Restore board position
-        start_row, start_col = move['start']
-        end_row, end_col = move['end']
+        # Undo castling
+        if flags == KING_CASTLE or flags == QUEEN_CASTLE:
+            rook_start, rook_end = (7, 5) if flags == KING_CASTLE else (0, 3)
+            self.set_square(end_row, rook_end, "--")
+            self.set_square(end_row, rook_start, piece_moved[0] + 'R')
         
-        self.board[start_row][start_col] = move['piece_moved']
-        self.board[end_row][end_col] = move['piece_captured']
+        # Restore board position
+        self.set_square(end_row, end_col, piece_captured)
+        if flags == EN_PASSANT:
+            self.set_square(start_row, end_col, 'bP' if piece_moved[0] == 'w' else 'wP')
+        self.set_square(start_row, start_col, piece_moved)
         
         # Restore captured piece tracking
-        if move['piece_captured'] != "--":
-            if move['piece_moved'][0] == 'w' and len(self.white_captured) > 0:
+        if piece_captured != "--":
+            if piece_moved[0] == 'w' and len(self.white_captured) > 0:
                 self.white_captured.pop()
-            elif move['piece_moved'][0] == 'b' and len(self.black_captured) > 0:
+            elif piece_moved[0] == 'b' and len(self.black_captured) > 0:
                 self.black_captured.pop()
         
         # Restore king locations
-        self.white_king_location = move['white_king_loc']
-        self.black_king_location = move['black_king_loc']
-        
-        # Undo en passant
-        if move['is_en_passant']:
-            captured_pawn = 'bP' if move['piece_moved'][0] == 'w' else 'wP'
-            self.board[move['en_passant_captured_pos'][0]][move['en_passant_captured_pos'][1]] = captured_pawn
-            self.board[end_row][end_col] = "--"
-            
-        # Undo castling
-        if move['is_castle']:
-            rook_piece = 'wR' if move['piece_moved'][0] == 'w' else 'bR'
-            self.board[move['rook_start'][0]][move['rook_start'][1]] = rook_piece
-            self.board[move['rook_end'][0]][move['rook_end'][1]] = "--"
-            
-        # Restore en passant possibility
-        self.en_passant_possible = move['en_passant_possible']
-        
-        # Restore castling rights
-        self.castle_rights_log.pop()
-        self.current_castling_right = self.castle_rights_log[-1]
-        
-        return True
-
-    def update_castle_rights(self, move):
-        if move == 'wK':
-            self.current_castling_right.wks = False
-            self.current_castling_right.wqs = False
-        elif move == 'bK':
-            self.current_castling_right.bks = False
-            self.current_castling_right.bqs = False
-        elif move == 'wR':
-            # We need to know WHICH rook. We only have piece type here.
-            # This logic is imperfect without start/end pos in arguments.
-            # However, for now, we will assume standard initial setup or handle it in validation.
-            # Ideally `move` should take full move object or we check coords.
-            pass 
-        # Better handled in `move` if we check coordinates of start_row/col
-
-    # Helper to check if a move leaves king in check
-    def does_move_leave_in_check(self, start, end, turn):
-        # 1. Make move
-        start_row, start_col = start
-        end_row, end_col = end
-        
-        piece_moved = self.board[start_row][start_col]
-        piece_captured = self.board[end_row][end_col]
-        
-        # En Passant capture logic for restoration
-        en_passant_captured_piece = None
-        is_en_passant = False
-        if piece_moved[1] == 'P' and (end_row, end_col) == self.en_passant_possible:
-            is_en_passant = True
-            en_passant_captured_piece = self.board[start_row][end_col]
-            self.board[start_row][end_col] = "--"
-            
-        self.board[end_row][end_col] = piece_moved
-        self.board[start_row][start_col] = "--"
-        
-        # Update King loc temp
-        original_king_loc = self.white_king_location if turn == 'w' else self.black_king_location
         if piece_moved == 'wK':
-            self.white_king_location = (end_row, end_col)
+            self.white_king_location = COORDS[code & 63]
         elif piece_moved == 'bK':
-            self.black_king_location = (end_row, end_col)
-            
-        # 2. Check for check
-        in_check = self.is_in_check(turn)
+            self.black_king_location = COORDS[code & 63]
         
-        # 3. Undo move
-        self.board[start_row][start_col] = piece_moved
-        self.board[end_row][end_col] = piece_captured
+        self.en_passant_possible = record.en_passant_possible
+        self.castling_rights = record.castling_rights
+        self.halfmove_clock = record.halfmove_clock
+        self.zobrist_key = record.zobrist_key
+        self.mg_score = record.mg_score
+        self.eg_score = record.eg_score
+        self.phase = record.phase
         
-        if is_en_passant:
-            self.board[start_row][end_col] = en_passant_captured_piece
-            
-        if piece_moved == 'wK':
-            self.white_king_location = original_king_loc
-        elif piece_moved == 'bK':
-            self.black_king_location = original_king_loc
-            
-        return in_check
+        return True
 
     def is_in_check(self, turn):
         if turn == 'w':
-            return self.square_under_attack(self.white_king_location[0], self.white_king_location[1], 'b')
+            row, col = self.white_king_location
+            return self.attack_counts['b'][row * 8 + col] != 0
         else:
-            return self.square_under_attack(self.black_king_location[0], self.black_king_location[1], 'w')
+            row, col = self.black_king_location
+            return self.attack_counts['w'][row * 8 + col] != 0
     
-    def is_checkmate(self, turn):
-        # Checkmate = in check AND no legal moves
-        if not self.is_in_check(turn):
-            return False
-        
-        # Check if any piece has any legal move
+    def game_status(self, turn):
+        """ 'checkmate', 'stalemate', 'insufficient', 'fifty_move', 'repetition',
+        'check' or 'ongoing' with `turn` to move.
+
+        Worked out in one pass and remembered until the next move or undo.
+        """
+        if self._status is not None and self._status[0] == turn:
+            return self._status[1]
+        in_check, has_moves, dead_material = self._scan_status(turn)
+        if not has_moves:
+            status = 'checkmate' if in_check else 'stalemate'
+        elif dead_material:
+            status = 'insufficient'
+        elif self.halfmove_clock >= 100:
+            status = 'fifty_move'
+        elif self.repetition_count() >= 3:
+            status = 'repetition'
+        elif in_check:
+            status = 'check'
+        else:
+            status = 'ongoing'
+        self._status = (turn, status)
+        return status
+
+    def _scan_status(self, turn):
+        # (in check, any legal move, insufficient material) from one walk over
+        # the board, generating moves only until the first legal one turns up
+        moves, king_location, block_squares, pin_directions = self._prepare_moves(turn)
+        if pin_directions is None:
+            return True, len(moves) > 0, False  # Double check: two enemy pieces, never a material draw
+        pieces = {'w': [], 'b': []}
         for row in range(8):
             for col in range(8):
                 piece = self.board[row][col]
-                if piece != "--" and piece[0] == turn:
-                    moves = self.get_valid_moves((row, col))
-                    if len(moves) > 0:
-                        return False  # Found a legal move, not checkmate
-        
-        return True  # No legal moves found, it's checkmate
+                if piece == "--" or piece[1] == 'K':
+                    continue
+                pieces[piece[0]].append(piece[1])
+                if not moves and piece[0] == turn:
+                    self._piece_moves(row, col, piece[1], turn, pin_directions.get((row, col)),
+                                      block_squares, king_location, moves)
+        return self.in_check, len(moves) > 0, material_draw(pieces['w'], pieces['b'])
+
+    def repetition_count(self, limit=3):
+        """ How often the current position has occurred, this time included (counting
+        stops at `limit`). Positions before the last capture or pawn move cannot
+        match, so only the last halfmove_clock plies are looked at. """
+        history = self.key_history
+        key = self.zobrist_key
+        count = 1
+        last = len(history) - 1
+        for i in range(last - 2, max(last - self.halfmove_clock, 0) - 1, -2):
+            if history[i] == key:
+                count += 1
+                if count >= limit:
+                    break
+        return count
+
+    def is_repetition(self):
+        # The current position occurred before (what search treats as a draw)
+        return self.repetition_count(2) >= 2
+
+    def is_checkmate(self, turn):
+        # Checkmate = in check AND no legal moves
+        return self.game_status(turn) == 'checkmate'
     
     def is_stalemate(self, turn):
         # Stalemate = NOT in check AND no legal moves
-        if self.is_in_check(turn):
-            return False
-        
-        # Check if any piece has any legal move
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece != "--" and piece[0] == turn:
-                    moves = self.get_valid_moves((row, col))
-                    if len(moves) > 0:
-                        return False  # Found a legal move, not stalemate
-        
-        return True  # No legal moves and not in check = stalemate
+        return self.game_status(turn) == 'stalemate'
     
     def is_insufficient_material(self):
-        # Count pieces on board
+        # Count pieces on board (kings left out)
         pieces = {'w': [], 'b': []}
         
         for row in range(8):
             for col in range(8):
                 piece = self.board[row][col]
-                if piece != "--":
+                if piece != "--" and piece[1] != 'K':
                     pieces[piece[0]].append(piece[1])
         
-        white_pieces = pieces['w']
-        black_pieces = pieces['b']
-        
-        # Remove kings from count
-        white_pieces = [p for p in white_pieces if p != 'K']
-        black_pieces = [p for p in black_pieces if p != 'K']
-        
-        # King vs King
-        if len(white_pieces) == 0 and len(black_pieces) == 0:
-            return True
-        
-        # King vs King + Bishop
-        if len(white_pieces) == 0 and len(black_pieces) == 1 and black_pieces[0] == 'B':
-            return True
-        if len(black_pieces) == 0 and len(white_pieces) == 1 and white_pieces[0] == 'B':
-            return True
+        return material_draw(pieces['w'], pieces['b'])
+
+    def square_under_attack(self, r, c, enemy_color):
+        return self.attack_counts[enemy_color][r * 8 + c] != 0
+
+    def scan_square_attacked(self, r, c, enemy_color):
+        # Same answer as square_under_attack, worked out from the board itself.
+        # For positions set up temporarily without set_square (the attack maps
+        # do not follow those).
+        board = self.board
+        sq = r * 8 + c
+        rays = RAYS[sq]
+        queen = enemy_color + 'Q'
+        
+        # Sliders: the first piece on each ray
+        for j in range(8):
+            slider = enemy_color + ('R' if j < 4 else 'B')
+            for end_row, end_col, _ in rays[j]:
+                end_piece = board[end_row][end_col]
+                if end_piece != "--":
+                    if end_piece == slider or end_piece == queen:
+                        return True
+                    break # Blocked
+        
+        knight = enemy_color + 'N'
+        for end_row, end_col, _ in KNIGHT_TARGETS[sq]:
+            if board[end_row][end_col] == knight:
+                return True
         
-        # King vs King + Knight
-        if len(white_pieces) == 0 and len(black_pieces) == 1 and black_pieces[0] == 'N':
-            return True
-        if len(black_pieces) == 0 and len(white_pieces) == 1 and white_pieces[0] == 'N':
-            return True
+        # Enemy pawns attack (r, c) from the squares our own pawn there would attack
+        pawn = enemy_color + 'P'
+        for end_row, end_col, _ in PAWN_ATTACKS['b' if enemy_color == 'w' else 'w'][sq]:
+            if board[end_row][end_col] == pawn:
+                return True
         
-        # King + Bishop vs King + Bishop (same color squares)
-        if len(white_pieces) == 1 and white_pieces[0] == 'B' and \
-           len(black_pieces) == 1 and black_pieces[0] == 'B':
-            # This is a simplified check - ideally we'd check if bishops are on same colored squares
-            return True
+        king = enemy_color + 'K'
+        for end_row, end_col, _ in KING_TARGETS[sq]:
+            if board[end_row][end_col] == king:
+                return True
         
         return False
 
-    def square_under_attack(self, r, c, enemy_color):
-        # Check for all enemy piece types attacking (r, c)
-        
-        # 1. Rook/Queen (Orthogonal)
-        directions = [(-1, 0), (0, -1), (1, 0), (0, 1)]
-        for d in directions:
-            for i in range(1, 8):
-                end_row = r + d[0] * i
-                end_col = c + d[1] * i
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece != "--":
-                        if end_piece[0] == enemy_color and (end_piece[1] == 'R' or end_piece[1] == 'Q'):
-                            return True
-                        break # Blocked
-                else:
-                    break
-                    
-        # 2. Bishop/Queen (Diagonal)
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        for d in directions:
-            for i in range(1, 8):
-                end_row = r + d[0] * i
-                end_col = c + d[1] * i
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece != "--":
-                        if end_piece[0] == enemy_color and (end_piece[1] == 'B' or end_piece[1] == 'Q'):
-                            return True
-                        break # Blocked
-                else:
-                    break
-        
-        # 3. Knight
-        knight_moves = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-        for m in knight_moves:
-            end_row = r + m[0]
-            end_col = c + m[1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] == enemy_color and end_piece[1] == 'N':
-                    return True
-                    
-        # 4. Pawn
-        pawn_dir = 1 if enemy_color == 'w' else -1 # Enemy pawn moves DOWN (if black) ? No wait.
-        # If I am White, enemy is Black. Black pawns are at low rows moving to high rows (index increases).
-        # Actually in this board setup:
-        # White at rows 6,7. Black at 0,1.
-        # White moves Up (index decreases). Black moves Down (index increases).
-        
-        pawn_dir = 1 if enemy_color == 'b' else -1
-        
-        # Attack indices (from the pawn's perspective, it attacks diagonally forward)
-        # So we look "backwards" from the king's perspective.
-        # If King is at (r,c), a pawn at (r-1, c-1) attacks it if pawn goes DOWN (+1).
-        # Wait, let's keep it simple: Look at squares where a pawn could be attacking FROM.
-        
-        # If enemy is Black (moves +1), they must be at (r-1, c+/-1) to attack (r,c) ??
-        # Example: Black Pawn at (1,0). Attacks (2,1).
-        # So if target is (2,1), we check (2-1, 1-1) = (1,0).
-        
-        check_row = r - pawn_dir # Look 'behind' the attack direction
-        if 0 <= check_row < 8:
-            if 0 <= c - 1 < 8:
-                p = self.board[check_row][c - 1]
-                if p[0] == enemy_color and p[1] == 'P':
-                    return True
-            if 0 <= c + 1 < 8:
-                p = self.board[check_row][c + 1]
-                if p[0] == enemy_color and p[1] == 'P':
-                    return True
-                    
-        # 5. King
-        king_moves = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
-        for m in king_moves:
-            end_row = r + m[0]
-            end_col = c + m[1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] == enemy_color and end_piece[1] == 'K':
-                    return True
-                    
-        return False
+    def square_attackers(self, r, c, color):
+        # Same walk as scan_square_attacked, but collects every `color` piece
+        # attacking (r, c) as (row, col) instead of stopping at the first
+        attackers = []
+        board = self.board
+        sq = r * 8 + c
+        rays = RAYS[sq]
+        queen = color + 'Q'
+        
+        for j in range(8):
+            slider = color + ('R' if j < 4 else 'B')
+            for end_row, end_col, _ in rays[j]:
+                end_piece = board[end_row][end_col]
+                if end_piece != "--":
+                    if end_piece == slider or end_piece == queen:
+                        attackers.append((end_row, end_col))
+                    break # Blocked
+        
+        knight = color + 'N'
+        for end_row, end_col, _ in KNIGHT_TARGETS[sq]:
+            if board[end_row][end_col] == knight:
+                attackers.append((end_row, end_col))
+        
+        pawn = color + 'P'
+        for end_row, end_col, _ in PAWN_ATTACKS['b' if color == 'w' else 'w'][sq]:
+            if board[end_row][end_col] == pawn:
+                attackers.append((end_row, end_col))
+        
+        king = color + 'K'
+        for end_row, end_col, _ in KING_TARGETS[sq]:
+            if board[end_row][end_col] == king:
+                attackers.append((end_row, end_col))
+        
+        return attackers
 
     def is_valid_move(self, start, end, turn):
         start_row, start_col = start
         end_row, end_col = end
-        
+
         # Bounds check
         if not (0 <= end_row < 8 and 0 <= end_col < 8):
             return False
-            
+
         piece = self.board[start_row][start_col]
-        target = self.board[end_row][end_col]
-        
+
         # Must select own piece
         if piece == "--" or piece[0] != turn:
             return False
-            
-        # Cannot capture own piece
-        if target != "--" and target[0] == turn:
-            return False
-            
-        piece_type = piece[1]
-        
-        if piece_type == 'P':
-            if self._valid_pawn_move(start, end, piece, target):
-                return not self.does_move_leave_in_check(start, end, turn)
-        elif piece_type == 'R':
-            if self._valid_rook_move(start, end):
-                return not self.does_move_leave_in_check(start, end, turn)
-        elif piece_type == 'B':
-            if self._valid_bishop_move(start, end):
-                return not self.does_move_leave_in_check(start, end, turn)
-        elif piece_type == 'Q':
-            if self._valid_queen_move(start, end):
-                return not self.does_move_leave_in_check(start, end, turn)
-        elif piece_type == 'K':
-            if self._valid_king_move(start, end):
-                return not self.does_move_leave_in_check(start, end, turn)
-        elif piece_type == 'N':
-            if self._valid_knight_move(start, end):
-                return not self.does_move_leave_in_check(start, end, turn)
-            
-        return False
 
-    def _valid_pawn_move(self, start, end, piece, target):
-        start_row, start_col = start
-        end_row, end_col = end
-        direction = -1 if piece[0] == 'w' else 1
-        start_rank = 6 if piece[0] == 'w' else 1
-        
-        # Forward move
-        if start_col == end_col:
-            # One step
-            if end_row == start_row + direction and target == "--":
-                return True
-            # Two steps from start
-            if start_row == start_rank and end_row == start_row + 2 * direction:
-                if target == "--" and self.board[start_row + direction][start_col] == "--":
-                    return True
-        # Capture
-        elif abs(start_col - end_col) == 1 and end_row == start_row + direction:
-            if target != "--" and target[0] != piece[0]:
-                return True
-            # En Passant
-            elif (end_row, end_col) == self.en_passant_possible:
-                return True
-                
-        return False
+        return end in self.legal_targets(turn).get(start, ())
 
-    def _valid_rook_move(self, start, end):
-        start_row, start_col = start
-        end_row, end_col = end
-        
-        if start_row != end_row and start_col != end_col:
-            return False # Not straight line
-            
-        # Check path is clear
-        return self._check_path_clear(start, end)
+    def get_valid_moves(self, piece_pos):
+        # Target squares for one piece, taken from the cached legal move list
+        piece = self.board[piece_pos[0]][piece_pos[1]]
+        if piece == "--":
+            return []
+        return self.legal_targets(piece[0]).get(piece_pos, [])
 
-    def _valid_bishop_move(self, start, end):
-        start_row, start_col = start
-        end_row, end_col = end
-        
-        if abs(start_row - end_row) != abs(start_col - end_col):
-            return False # Not diagonal
-            
-        return self._check_path_clear(start, end)
+    def legal_targets(self, turn):
+        """ {start: [end, ...]} for every legal move of `turn`, generated once per
+        position and then served from move_cache (also after undo). The lists are
+        shared with the cache, so treat them as read-only. """
+        key = (self.zobrist_key, turn)
+        targets = self.move_cache.get(key)
+        if targets is None:
+            targets = {}
+            for start, end, promotion in self.generate_legal_moves(turn):
+                if promotion is None or promotion == 'Q': # Promotions share one target square
+                    targets.setdefault(start, []).append(end)
+            self.move_cache.put(key, targets)
+        return targets
 
-    def _valid_queen_move(self, start, end):
-        # Combined Rook and Bishop
-        return self._valid_rook_move(start, end) or self._valid_bishop_move(start, end)
+    def check_for_pins_and_checks(self, turn):
+        # Walk out from the king once: fills self.pins and self.checks with
+        # (row, col, dir_row, dir_col) entries and sets self.in_check
+        pins = []
+        checks = []
+        in_check = False
+        enemy = 'b' if turn == 'w' else 'w'
+        king_row, king_col = self.white_king_location if turn == 'w' else self.black_king_location
+        king_sq = king_row * 8 + king_col
+        board = self.board
+        rays = RAYS[king_sq]
 
-    def _valid_king_move(self, start, end):
-        start_row, start_col = start
-        end_row, end_col = end
-        
-        if abs(start_row - end_row) <= 1 and abs(start_col - end_col) <= 1:
-            return True
-            
-        # Castling
-        # 1. King must not have moved (checked via castle rights in move gen, but here we can check flags if we track strict piece objs)
-        # Using self.current_castling_right
-        if start_row == end_row and abs(start_col - end_col) == 2:
-            piece = self.board[start_row][start_col]
-            if piece[0] == 'w':
-                if start_row != 7 or start_col != 4: return False
-                if end_col == 6 and self.current_castling_right.wks: # Kingside
-                     if self.board[7][5] == "--" and self.board[7][6] == "--" and \
-                        not self.square_under_attack(7, 4, 'b') and \
-                        not self.square_under_attack(7, 5, 'b') and \
-                        not self.square_under_attack(7, 6, 'b'):
-                            return True
-                elif end_col == 2 and self.current_castling_right.wqs: # Queenside
-                    if self.board[7][1] == "--" and self.board[7][2] == "--" and self.board[7][3] == "--" and \
-                       not self.square_under_attack(7, 4, 'b') and \
-                       not self.square_under_attack(7, 3, 'b') and \
-                       not self.square_under_attack(7, 2, 'b'):
-                           return True
-            elif piece[0] == 'b':
-                if start_row != 0 or start_col != 4: return False
-                if end_col == 6 and self.current_castling_right.bks:
-                     if self.board[0][5] == "--" and self.board[0][6] == "--" and \
-                        not self.square_under_attack(0, 4, 'w') and \
-                        not self.square_under_attack(0, 5, 'w') and \
-                        not self.square_under_attack(0, 6, 'w'):
-                            return True
-                elif end_col == 2 and self.current_castling_right.bqs:
-                    if self.board[0][1] == "--" and self.board[0][2] == "--" and self.board[0][3] == "--" and \
-                       not self.square_under_attack(0, 4, 'w') and \
-                       not self.square_under_attack(0, 3, 'w') and \
-                       not self.square_under_attack(0, 2, 'w'):
-                           return True
+        for j in range(8):
+            d = DIRECTIONS[j]
+            possible_pin = ()
+            for end_row, end_col, _ in rays[j]:
+                end_piece = board[end_row][end_col]
+                if end_piece == "--":
+                    continue
+                if end_piece[0] == turn:
+                    if possible_pin == ():
+                        possible_pin = (end_row, end_col, d[0], d[1])
+                    else:
+                        break # Two own pieces, no pin on this line
+                else:
+                    piece_type = end_piece[1]
+                    # Orthogonal: R/Q, diagonal: B/Q
+                    if (j <= 3 and piece_type in 'RQ') or (j >= 4 and piece_type in 'BQ'):
+                        if possible_pin == ():
+                            in_check = True
+                            checks.append((end_row, end_col, d[0], d[1]))
+                        else:
+                            pins.append(possible_pin)
+                    break
 
-        return False
+        knight = enemy + 'N'
+        for end_row, end_col, _ in KNIGHT_TARGETS[king_sq]:
+            if board[end_row][end_col] == knight:
+                in_check = True
+                checks.append((end_row, end_col, end_row - king_row, end_col - king_col))
 
-    def _valid_knight_move(self, start, end):
-        start_row, start_col = start
-        end_row, end_col = end
-        
-        row_diff = abs(start_row - end_row)
-        col_diff = abs(start_col - end_col)
-        
-        return (row_diff == 2 and col_diff == 1) or (row_diff == 1 and col_diff == 2)
+        # Enemy pawns attack the king from the squares our own pawn would attack
+        pawn = enemy + 'P'
+        for end_row, end_col, _ in PAWN_ATTACKS[turn][king_sq]:
+            if board[end_row][end_col] == pawn:
+                in_check = True
+                checks.append((end_row, end_col, end_row - king_row, end_col - king_col))
 
-    def get_valid_moves(self, piece_pos):
+        self.in_check = in_check
+        self.pins = pins
+        self.checks = checks
+        return in_check, pins, checks
+
+    def generate_legal_moves(self, turn):
+        """ All legal moves for `turn` as (start, end, promotion) tuples.
+
+        promotion is None for ordinary moves and one of 'Q', 'R', 'B', 'N' for
+        pawn promotions.  Pins and checks are computed once for the position,
+        so candidates are filtered without making and unmaking them.
+        """
+        moves, king_location, block_squares, pin_directions = self._prepare_moves(turn)
+        if pin_directions is None:
+            return moves # Double check, only the king can move
+
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece == "--" or piece[0] != turn or piece[1] == 'K':
+                    continue
+                self._piece_moves(row, col, piece[1], turn, pin_directions.get((row, col)),
+                                  block_squares, king_location, moves)
+        return moves
+
+    def _prepare_moves(self, turn):
+        # King moves plus what constrains every other piece: (moves, king location,
+        # squares a move must land on or None, pinned square -> pin direction).
+        # The pins come back as None in double check, when only the king may move.
+        in_check, pins, checks = self.check_for_pins_and_checks(turn)
+        king_location = self.white_king_location if turn == 'w' else self.black_king_location
         moves = []
-        piece_row, piece_col = piece_pos
-        piece = self.board[piece_row][piece_col]
-        turn = piece[0]
-        piece_type = piece[1]
-        
-        candidates = []
-        
-        if piece_type == 'P':
-            # Forward 1
-            direction = -1 if turn == 'w' else 1
-            if 0 <= piece_row + direction < 8:
-                candidates.append((piece_row + direction, piece_col))
-                # Forward 2
-                start_rank = 6 if turn == 'w' else 1
-                if piece_row == start_rank:
-                     candidates.append((piece_row + 2 * direction, piece_col))
-                # Captures
-                if piece_col - 1 >= 0: candidates.append((piece_row + direction, piece_col - 1))
-                if piece_col + 1 < 8: candidates.append((piece_row + direction, piece_col + 1))
-                
-        elif piece_type == 'R':
-            directions = [(-1, 0), (0, -1), (1, 0), (0, 1)]
-            for d in directions:
-                for i in range(1, 8):
-                    r, c = piece_row + d[0]*i, piece_col + d[1]*i
-                    if 0 <= r < 8 and 0 <= c < 8:
-                        candidates.append((r, c))
-                        if self.board[r][c] != "--": break
-                    else: break
-                    
-        elif piece_type == 'B':
-            directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for d in directions:
-                for i in range(1, 8):
-                    r, c = piece_row + d[0]*i, piece_col + d[1]*i
-                    if 0 <= r < 8 and 0 <= c < 8:
-                        candidates.append((r, c))
-                        if self.board[r][c] != "--": break
-                    else: break
-                    
-        elif piece_type == 'Q':
-            # R + B logic simplified
-            directions = [(-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for d in directions:
-                for i in range(1, 8):
-                    r, c = piece_row + d[0]*i, piece_col + d[1]*i
-                    if 0 <= r < 8 and 0 <= c < 8:
-                        candidates.append((r, c))
-                        if self.board[r][c] != "--": break
-                    else: break
-                    
-        elif piece_type == 'K':
-            moves_delta = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
-            for d in moves_delta:
-                r, c = piece_row + d[0], piece_col + d[1]
-                if 0 <= r < 8 and 0 <= c < 8:
-                    candidates.append((r, c))
-            # Castling moves
-            if turn == 'w':
-                candidates.append((7, 6)) # King side
-                candidates.append((7, 2)) # Queen side
+
+        self._king_moves(king_location, turn, in_check, moves)
+        if len(checks) > 1:
+            return moves, king_location, None, None
+
+        # Squares a non-king move must land on (None = anywhere)
+        block_squares = None
+        if in_check:
+            check_row, check_col, dir_row, dir_col = checks[0]
+            if self.board[check_row][check_col][1] == 'N':
+                block_squares = {(check_row, check_col)}
             else:
-                candidates.append((0, 6))
-                candidates.append((0, 2))
-                    
+                block_squares = set()
+                ray = RAYS[king_location[0] * 8 + king_location[1]][DIRECTION_INDEX[(dir_row, dir_col)]]
+                for r, c, _ in ray:
+                    block_squares.add((r, c))
+                    if r == check_row and c == check_col:
+                        break
+
+        pin_directions = {}
+        for pin_row, pin_col, dir_row, dir_col in pins:
+            pin_directions[(pin_row, pin_col)] = (dir_row, dir_col)
+        return moves, king_location, block_squares, pin_directions
+
+    def _piece_moves(self, row, col, piece_type, turn, pin, block_squares, king_location, moves):
+        if piece_type == 'P':
+            self._pawn_moves(row, col, turn, pin, block_squares, king_location, moves)
         elif piece_type == 'N':
-            # Knight ka logic
-            knight_moves = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
-            for d in knight_moves:
-                r, c = piece_row + d[0], piece_col + d[1]
-                if 0 <= r < 8 and 0 <= c < 8:
-                    candidates.append((r, c))
-
-        # Check validity for all candidates
-        for target in candidates:
-            if self.is_valid_move(piece_pos, target, turn):
-                moves.append(target)
-                
-        return moves
+            if pin is None: # A pinned knight can never move
+                self._knight_moves(row, col, turn, block_squares, moves)
+        else:
+            self._slider_moves(row, col, piece_type, turn, pin, block_squares, moves)
 
-    def _check_path_clear(self, start, end):
-        start_row, start_col = start
-        end_row, end_col = end
-        
-        row_step = 0
-        if end_row > start_row: row_step = 1
-        elif end_row < start_row: row_step = -1
-        
-        col_step = 0
-        if end_col > start_col: col_step = 1
-        elif end_col < start_col: col_step = -1
-        
-        current_row = start_row + row_step
-        current_col = start_col + col_step
-        
-        while current_row != end_row or current_col != end_col:
-            if self.board[current_row][current_col] != "--":
-                return False
-            current_row += row_step
-            current_col += col_step
-            
-        return True
\ No newline at end of file
+    def _pawn_moves(self, row, col, turn, pin, block_squares, king_location, moves):
+        direction = -1 if turn == 'w' else 1
+        start_rank = 6 if turn == 'w' else 1
+        last_rank = 0 if turn == 'w' else 7
+        enemy = 'b' if turn == 'w' else 'w'
+
+        targets = []
+        end_row = row + direction
+        # Forward moves
+        if (pin is None or pin == (direction, 0) or pin == (-direction, 0)) and self.board[end_row][col] == "--":
+            targets.append((end_row, col))
+            if row == start_rank and self.board[row + 2 * direction][col] == "--":
+                targets.append((row + 2 * direction, col))
+        # Captures
+        for _, end_col, _ in PAWN_ATTACKS[turn][row * 8 + col]:
+            dc = end_col - col
+            if pin is not None and pin != (direction, dc) and pin != (-direction, -dc):
+                continue
+            if self.board[end_row][end_col][0] == enemy:
+                targets.append((end_row, end_col))
+            elif (end_row, end_col) == self.en_passant_possible:
+                # Capturing en passant also removes a checking pawn beside us
+                if block_squares is None or (end_row, end_col) in block_squares or (row, end_col) in block_squares:
+                    if not self._en_passant_reveals_check(row, col, end_col, turn, king_location):
+                        moves.append(((row, col), (end_row, end_col), None))
+
+        for end in targets:
+            if block_squares is not None and end not in block_squares:
+                continue
+            if end[0] == last_rank:
+                for promotion in ('Q', 'R', 'B', 'N'):
+                    moves.append(((row, col), end, promotion))
+            else:
+                moves.append(((row, col), end, None))
+
+    def _en_passant_reveals_check(self, row, col, captured_col, turn, king_location):
+        # Two pawns leave the board lines at once, which the pin scan cannot see,
+        # so test this (rare) move directly
+        enemy = 'b' if turn == 'w' else 'w'
+        end_row = row - 1 if turn == 'w' else row + 1
+        pawn, captured = self.board[row][col], self.board[row][captured_col]
+        self.board[row][col] = "--"
+        self.board[row][captured_col] = "--"
+        self.board[end_row][captured_col] = pawn
+        in_check = self.scan_square_attacked(king_location[0], king_location[1], enemy)
+        self.board[end_row][captured_col] = "--"
+        self.board[row][captured_col] = captured
+        self.board[row][col] = pawn
+        return in_check
+
+    def _knight_moves(self, row, col, turn, block_squares, moves):
+        for r, c, _ in KNIGHT_TARGETS[row * 8 + col]:
+            if self.board[r][c][0] != turn:
+                if block_squares is None or (r, c) in block_squares:
+                    moves.append(((row, col), (r, c), None))
+
+    def _slider_moves(self, row, col, piece_type, turn, pin, block_squares, moves):
+        board = self.board
+        rays = RAYS[row * 8 + col]
+        for j in SLIDER_DIRECTIONS[piece_type]:
+            d = DIRECTIONS[j]
+            # Pinned sliders keep to the pin line (towards or away from the king)
+            if pin is not None and pin != d and pin != (-d[0], -d[1]):
+                continue
+            for r, c, _ in rays[j]:
+                target = board[r][c]
+                if target != "--" and target[0] == turn:
+                    break
+                if block_squares is None or (r, c) in block_squares:
+                    moves.append(((row, col), (r, c), None))
+                if target != "--":
+                    break
+
+    def _king_moves(self, king_location, turn, in_check, moves):
+        king_row, king_col = king_location
+        enemy = 'b' if turn == 'w' else 'w'
+        attacked = self.attack_counts[enemy]
+
+        # The attack maps see the king as a blocker, so a slider checking it
+        # also covers the square straight behind the king
+        behind = []
+        for check_row, check_col, dir_row, dir_col in self.checks:
+            if self.board[check_row][check_col][1] in 'RBQ':
+                behind.append((king_row - dir_row, king_col - dir_col))
+
+        for r, c, sq in KING_TARGETS[king_row * 8 + king_col]:
+            if self.board[r][c][0] != turn:
+                if not attacked[sq] and (r, c) not in behind:
+                    moves.append((king_location, (r, c), None))
+
+        if in_check:
+            return
+
+        # Castling: rights, empty path, and the king never passes an attacked square
+        home_row = 7 if turn == 'w' else 0
+        if king_location != (home_row, 4):
+            return
+        if turn == 'w':
+            king_side, queen_side = self.castling_rights & WHITE_KINGSIDE, self.castling_rights & WHITE_QUEENSIDE
+        else:
+            king_side, queen_side = self.castling_rights & BLACK_KINGSIDE, self.castling_rights & BLACK_QUEENSIDE
+        rook = turn + 'R'
+        if king_side and self.board[home_row][7] == rook and \
+           self.board[home_row][5] == "--" and self.board[home_row][6] == "--" and \
+           not attacked[home_row * 8 + 5] and not attacked[home_row * 8 + 6]:
+            moves.append((king_location, (home_row, 6), None))
+        if queen_side and self.board[home_row][0] == rook and \
+           self.board[home_row][1] == "--" and self.board[home_row][2] == "--" and self.board[home_row][3] == "--" and \
+           not attacked[home_row * 8 + 3] and not attacked[home_row * 8 + 2]:
+            moves.append((king_location, (home_row, 2), None))
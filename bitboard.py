@@ -0,0 +1,386 @@
+from Board import Board, material_draw, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+# Bitboard backend for Board.
+#
+# Square index is row * 8 + col, the same (row, col) layout Board uses, so
+# bit 0 is a8 (top-left from White's side) and bit 63 is h1.
+# Sliding attacks use fixed-shift magic bitboards: the relevant occupancy of a
+# square is multiplied by a magic number and the top bits index a table that
+# was filled once at import time.
+
+FULL = (1 << 64) - 1
+
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+SQUARES = [(sq // 8, sq % 8) for sq in range(64)]
+
+# Magic multipliers found with find_magic() using random.Random(2024),
+# all rook squares first and then all bishop squares
+ROOK_MAGICS = [
+    0x2080001440022581, 0x1080200040001080, 0x4080100008200080, 0x0280080080100254,
+    0x4D8004000A180080, 0x0100080400020100, 0x1080010040800200, 0x0200004402002081,
+    0x0068800024884004, 0x1000804000802002, 0x000200208A001040, 0x3008801000800800,
+    0x2006001060440A00, 0x1000800200800400, 0x0004000441024810, 0xA001000082004100,
+    0x0040808000204014, 0x0000424002201000, 0x0010110041002000, 0x0000090021041000,
+    0x0204008004800800, 0x0000808004000200, 0x6006040021485042, 0x0000020002409924,
+    0x2000401980028020, 0x4000400100308100, 0x0000820200201041, 0xB100100080800800,
+    0x3004080080040080, 0x0802000200041009, 0x01A0580400021110, 0x00020042000408A1,
+    0x4218884000800023, 0x0480201000400045, 0x0010200080801000, 0x1200200901001000,
+    0x0000100801000500, 0x0080020080800400, 0x004A000100404080, 0x0480005402001081,
+    0x258000402000C000, 0xA010004820084002, 0x0480200010008080, 0x244100100021000C,
+    0x2040080005010010, 0x0012000810020004, 0x0011000200B9000C, 0x1121000080410002,
+    0x00082080410A0600, 0x4002008100402600, 0x0A0300E008544100, 0x7B00080010008080,
+    0x0300080100100500, 0x0002020080040080, 0x0042521810214400, 0x8A00004089140200,
+    0x00001280010A2041, 0x0400401102042086, 0x41902000100C4101, 0x0043020420900009,
+    0x00E2000410082002, 0x4402000108041002, 0x2100101A00814804, 0x0400010400218246,
+]
+
+BISHOP_MAGICS = [
+    0x0102040418220020, 0x0108024802002028, 0x8010044040400001, 0x0022209200044800,
+    0x4004504005040114, 0x0022010420A80800, 0x0008441008090002, 0x0000420801480200,
+    0x1100220244011C00, 0x00883004081AB020, 0x4400100152002000, 0x4019080841004000,
+    0x2861021210000000, 0x400EA10108400020, 0x4800208208A24000, 0x0020A500A0842085,
+    0x3410000802504400, 0x0010E0200C010060, 0x0014182042408200, 0x4094006840112109,
+    0x2014200202010000, 0x000100020080C400, 0x800400420D2C0200, 0x0002200182251000,
+    0x0010F10304C41000, 0x001024A008281084, 0x0088110002040100, 0x0820080001004008,
+    0x0104040020410050, 0x0110002027040500, 0x418C008009182100, 0x2C00A9040C80480B,
+    0x008110C8005020A4, 0x4004210802041000, 0x0004020108208100, 0x0000080800120A00,
+    0x430C008400820102, 0x1400808100020108, 0x005006020010A8A0, 0x000801868004A220,
+    0x00420105C00C2000, 0x1010921032019040, 0x0300222028103000, 0x0008004208001080,
+    0x5410202248811400, 0x0008010800800808, 0x3C02C20404000900, 0x0408022282040032,
+    0x0000941002100000, 0x0112209A10100804, 0x080C020111210000, 0x442002A442022008,
+    0x00084A181B040000, 0x00115021021C2080, 0x4010051000A20000, 0x0404688085060000,
+    0x0000220110011000, 0x140000220734200C, 0x0440010424020800, 0x2204828883460800,
+    0x0020000004050410, 0x4060004A20082080, 0x00489034B002C201, 0x0444049010410300,
+]
+
+
+def _ray_attacks(sq, directions, occupied):
+    attacks = 0
+    row, col = SQUARES[sq]
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            attacks |= 1 << (r * 8 + c)
+            if occupied >> (r * 8 + c) & 1:
+                break
+            r += dr
+            c += dc
+    return attacks
+
+
+def _relevant_mask(sq, directions):
+    # Ray squares excluding the board edge, the edge never changes the result
+    mask = 0
+    row, col = SQUARES[sq]
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        while 0 <= r + dr < 8 and 0 <= c + dc < 8:
+            mask |= 1 << (r * 8 + c)
+            r += dr
+            c += dc
+    return mask
+
+
+def _subsets(mask):
+    # Carry-Rippler enumeration of every subset of mask
+    subset = 0
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if subset == 0:
+            return
+
+
+def find_magic(sq, directions, rng):
+    """ Search a magic multiplier for one square (used to regenerate the tables above) """
+    mask = _relevant_mask(sq, directions)
+    shift = 64 - mask.bit_count()
+    occupancies = list(_subsets(mask))
+    attacks = [_ray_attacks(sq, directions, occ) for occ in occupancies]
+    while True:
+        magic = rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        if (((mask * magic) & FULL) >> 56).bit_count() < 6:
+            continue  # Too few high bits, cannot spread the index well
+        used = {}
+        for occ, att in zip(occupancies, attacks):
+            index = ((occ * magic) & FULL) >> shift
+            if used.setdefault(index, att) != att:
+                break
+        else:
+            return magic
+
+
+def _build_magic_table(directions, magics):
+    masks, shifts, tables = [], [], []
+    for sq in range(64):
+        mask = _relevant_mask(sq, directions)
+        shift = 64 - mask.bit_count()
+        table = [0] * (1 << mask.bit_count())
+        for occ in _subsets(mask):
+            table[((occ * magics[sq]) & FULL) >> shift] = _ray_attacks(sq, directions, occ)
+        masks.append(mask)
+        shifts.append(shift)
+        tables.append(table)
+    return masks, shifts, tables
+
+
+ROOK_MASKS, ROOK_SHIFTS, ROOK_TABLE = _build_magic_table(ROOK_DIRECTIONS, ROOK_MAGICS)
+BISHOP_MASKS, BISHOP_SHIFTS, BISHOP_TABLE = _build_magic_table(BISHOP_DIRECTIONS, BISHOP_MAGICS)
+
+
+def _step_attacks(deltas):
+    table = []
+    for row, col in SQUARES:
+        attacks = 0
+        for dr, dc in deltas:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                attacks |= 1 << (r * 8 + c)
+        table.append(attacks)
+    return table
+
+
+KNIGHT_ATTACKS = _step_attacks([(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _step_attacks([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# Squares a pawn of the given color attacks from sq (white moves up = row - 1)
+PAWN_ATTACKS = {
+    'w': _step_attacks([(-1, -1), (-1, 1)]),
+    'b': _step_attacks([(1, -1), (1, 1)]),
+}
+
+
+def _between_table():
+    # BETWEEN[a][b] = squares strictly between a and b on a shared line, else 0
+    # LINE[a][b] = the full line through a and b (edge to edge), else 0
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        ar, ac = SQUARES[a]
+        for dr, dc in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            full = _ray_attacks(a, [(dr, dc)], 0) | _ray_attacks(a, [(-dr, -dc)], 0) | (1 << a)
+            squares = 0
+            r, c = ar + dr, ac + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                b = r * 8 + c
+                between[a][b] = squares
+                line[a][b] = full
+                squares |= 1 << b
+                r += dr
+                c += dc
+    return between, line
+
+
+BETWEEN, LINE = _between_table()
+
+
+def rook_attacks(sq, occupied):
+    return ROOK_TABLE[sq][(((occupied & ROOK_MASKS[sq]) * ROOK_MAGICS[sq]) & FULL) >> ROOK_SHIFTS[sq]]
+
+
+def bishop_attacks(sq, occupied):
+    return BISHOP_TABLE[sq][(((occupied & BISHOP_MASKS[sq]) * BISHOP_MAGICS[sq]) & FULL) >> BISHOP_SHIFTS[sq]]
+
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+PROMOTION_PIECES = ['Q', 'R', 'B', 'N']
+
+# Castling: (rights bit, king target, squares that must be empty, squares that must be safe, rook square)
+CASTLING = {
+    'w': [(WHITE_KINGSIDE, 62, [61, 62], [60, 61, 62], 63),
+          (WHITE_QUEENSIDE, 58, [57, 58, 59], [60, 59, 58], 56)],
+    'b': [(BLACK_KINGSIDE, 6, [5, 6], [4, 5, 6], 7),
+          (BLACK_QUEENSIDE, 2, [1, 2, 3], [4, 3, 2], 0)],
+}
+
+
+class BitboardBoard(Board):
+    """ Board with the rules engine running on 64-bit bitboards.
+
+    The 8x8 `board` list is still kept in sync (drawing and the UI read it), but
+    move generation and attack queries only touch the bitboards. Board's
+    attack_counts are not kept at all, so mailbox code that would read them
+    fails instead of answering from stale counts.
+    """
+
+    def sync_attack_maps(self):
+        # The bitboards answer every attack query on this backend
+        self.sync_bitboards()
+
+    def derived_state(self):
+        return (self.zobrist_key, self.mg_score, self.eg_score, self.phase,
+                dict(self.bitboards), dict(self.occupied))
+
+    def restore_derived_state(self, state):
+        self.zobrist_key, self.mg_score, self.eg_score, self.phase, bitboards, occupied = state
+        self.bitboards, self.occupied = dict(bitboards), dict(occupied)
+
+    def sync_bitboards(self):
+        # Rebuild every bitboard from the 8x8 list
+        self.bitboards = {color + kind: 0 for color in 'wb' for kind in 'KQRBNP'}
+        self.occupied = {'w': 0, 'b': 0}
+        for sq, (row, col) in enumerate(SQUARES):
+            piece = self.board[row][col]
+            if piece != "--":
+                self.bitboards[piece] |= 1 << sq
+                self.occupied[piece[0]] |= 1 << sq
+
+    def set_square(self, row, col, piece):
+        old = self.board[row][col]
+        bit = 1 << (row * 8 + col)
+        if old != "--":
+            self.bitboards[old] ^= bit
+            self.occupied[old[0]] ^= bit
+        if piece != "--":
+            self.bitboards[piece] ^= bit
+            self.occupied[piece[0]] ^= bit
+        self.board[row][col] = piece
+
+    def attackers_to(self, sq, enemy_color, occupied=None):
+        # Bitboard of enemy pieces attacking sq
+        if occupied is None:
+            occupied = self.occupied['w'] | self.occupied['b']
+        bb = self.bitboards
+        own = 'w' if enemy_color == 'b' else 'b'
+        queens = bb[enemy_color + 'Q']
+        return ((KNIGHT_ATTACKS[sq] & bb[enemy_color + 'N'])
+                | (KING_ATTACKS[sq] & bb[enemy_color + 'K'])
+                | (PAWN_ATTACKS[own][sq] & bb[enemy_color + 'P'])
+                | (rook_attacks(sq, occupied) & (bb[enemy_color + 'R'] | queens))
+                | (bishop_attacks(sq, occupied) & (bb[enemy_color + 'B'] | queens)))
+
+    def square_under_attack(self, r, c, enemy_color):
+        return self.attackers_to(r * 8 + c, enemy_color) != 0
+
+    def is_in_check(self, turn):
+        enemy = 'b' if turn == 'w' else 'w'
+        king = self.bitboards[turn + 'K']
+        return self.attackers_to(king.bit_length() - 1, enemy) != 0
+
+    def _scan_status(self, turn):
+        # Whole-board masks make the material count cheap. The moves are read
+        # through legal_targets, so the position's generation lands in
+        # move_cache and the GUI and notation, which ask for the same
+        # position's moves next, do not repeat it
+        bb = self.bitboards
+        pieces = {'w': [], 'b': []}
+        if bin(self.occupied['w'] | self.occupied['b']).count('1') <= 4:
+            for piece, mask in bb.items():
+                if piece[1] != 'K':
+                    pieces[piece[0]].extend(piece[1] * bin(mask).count('1'))
+            dead_material = material_draw(pieces['w'], pieces['b'])
+        else:
+            dead_material = False  # Three or more pieces besides the kings
+        return self.is_in_check(turn), len(self.legal_targets(turn)) > 0, dead_material
+
+    def generate_legal_moves(self, turn):
+        """ All legal moves for `turn` as (start, end, promotion) tuples.
+
+        promotion is None for ordinary moves and one of 'Q', 'R', 'B', 'N' for
+        pawn promotions.  Pins and checks are worked out once for the position
+        so no candidate needs a make/unmake.
+        """
+        enemy = 'b' if turn == 'w' else 'w'
+        bb = self.bitboards
+        own = self.occupied[turn]
+        their = self.occupied[enemy]
+        occupied = own | their
+        king_sq = bb[turn + 'K'].bit_length() - 1
+        moves = []
+
+        # King steps: test attacks with the king lifted off so it cannot hide behind itself
+        without_king = occupied ^ (1 << king_sq)
+        king_from = SQUARES[king_sq]
+        for to in iter_bits(KING_ATTACKS[king_sq] & ~own):
+            if not self.attackers_to(to, enemy, without_king):
+                moves.append((king_from, SQUARES[to], None))
+
+        checkers = self.attackers_to(king_sq, enemy, occupied)
+        if checkers & (checkers - 1):
+            return moves  # Double check, only the king can move
+
+        if checkers:
+            checker_sq = checkers.bit_length() - 1
+            target_mask = checkers | BETWEEN[king_sq][checker_sq]
+        else:
+            target_mask = FULL
+            for right, king_to, empty, safe, rook_sq in CASTLING[turn]:
+                if not self.castling_rights & right:
+                    continue
+                if king_sq != safe[0] or not bb[turn + 'R'] >> rook_sq & 1:
+                    continue
+                if any(occupied >> sq & 1 for sq in empty):
+                    continue
+                if any(self.attackers_to(sq, enemy, occupied) for sq in safe):
+                    continue
+                moves.append((king_from, SQUARES[king_to], None))
+
+        # Pinned pieces may only move along the line through their king
+        pin_lines = {}
+        queens = bb[enemy + 'Q']
+        snipers = ((rook_attacks(king_sq, 0) & (bb[enemy + 'R'] | queens))
+                   | (bishop_attacks(king_sq, 0) & (bb[enemy + 'B'] | queens)))
+        for sniper in iter_bits(snipers):
+            blockers = BETWEEN[king_sq][sniper] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pin_lines[blockers.bit_length() - 1] = LINE[king_sq][sniper]
+
+        def add_targets(from_sq, targets):
+            targets &= target_mask
+            if from_sq in pin_lines:
+                targets &= pin_lines[from_sq]
+            start = SQUARES[from_sq]
+            for to in iter_bits(targets):
+                moves.append((start, SQUARES[to], None))
+
+        not_own = ~own & FULL
+        for sq in iter_bits(bb[turn + 'N']):
+            if sq not in pin_lines:  # A pinned knight can never move
+                add_targets(sq, KNIGHT_ATTACKS[sq] & not_own)
+        for sq in iter_bits(bb[turn + 'B'] | bb[turn + 'Q']):
+            add_targets(sq, bishop_attacks(sq, occupied) & not_own)
+        for sq in iter_bits(bb[turn + 'R'] | bb[turn + 'Q']):
+            add_targets(sq, rook_attacks(sq, occupied) & not_own)
+
+        # Pawns
+        forward = -8 if turn == 'w' else 8
+        start_row = 6 if turn == 'w' else 1
+        last_row = 0 if turn == 'w' else 7
+        ep_sq = None
+        if self.en_passant_possible:
+            ep_sq = self.en_passant_possible[0] * 8 + self.en_passant_possible[1]
+        for sq in iter_bits(bb[turn + 'P']):
+            targets = PAWN_ATTACKS[turn][sq] & their
+            one = sq + forward
+            if not occupied >> one & 1:
+                targets |= 1 << one
+                two = one + forward
+                if sq // 8 == start_row and not occupied >> two & 1:
+                    targets |= 1 << two
+            targets &= target_mask
+            if sq in pin_lines:
+                targets &= pin_lines[sq]
+            start = SQUARES[sq]
+            for to in iter_bits(targets):
+                if to // 8 == last_row:
+                    for piece in PROMOTION_PIECES:
+                        moves.append((start, SQUARES[to], piece))
+                else:
+                    moves.append((start, SQUARES[to], None))
+
+            if ep_sq is not None and PAWN_ATTACKS[turn][sq] >> ep_sq & 1:
+                # Verify en passant directly, it can uncover a check along the rank
+                captured = ep_sq - forward
+                after = occupied ^ (1 << sq) ^ (1 << captured) | (1 << ep_sq)
+                attackers = self.attackers_to(king_sq, enemy, after) & ~(1 << captured)
+                if not attackers:
+                    moves.append((start, SQUARES[ep_sq], None))
+
+        return moves
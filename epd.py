@@ -0,0 +1,59 @@
+from Board import Board
+
+# Streaming FEN / EPD reader for test suites and position datasets.
+#
+# Each line holds one position, either a full FEN or the four EPD fields
+# followed by operations:
+#
+#   rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
+#   r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - bm Bb5; id "spanish";
+#   4k3/8/8/8/8/8/8/4K2R w K - 0 1 ;D1 15 ;D2 66
+#
+# Lines are read one at a time and can be loaded into a single reused Board,
+# so files with millions of positions never hold more than one in memory.
+
+
+def parse_line(line):
+    """ (fen, operations) for one FEN / EPD line, or None for blank lines and # comments.
+    operations maps each opcode to its operand string (quotes removed). """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    head, _, tail = line.partition(';')
+    fields = head.split()
+    if len(fields) < 4:
+        raise ValueError(f"Not a FEN/EPD position: {line!r}")
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        fen_fields, rest = fields[:6], fields[6:]
+    else:
+        fen_fields, rest = fields[:4], fields[4:]
+
+    operations = {}
+    for operation in [" ".join(rest)] + (tail.split(';') if tail else []):
+        opcode, _, operand = operation.strip().partition(' ')
+        if opcode:
+            operations[opcode] = operand.strip().strip('"')
+    return " ".join(fen_fields), operations
+
+
+def read_positions(path):
+    """ Yield (fen, operations) for every position in a FEN / EPD file """
+    with open(path) as f:
+        for line in f:
+            parsed = parse_line(line)
+            if parsed is not None:
+                yield parsed
+
+
+def load_positions(path, board=None, backend=Board):
+    """ Yield (board, turn, operations) for every position in a FEN / EPD file.
+
+    The same board (a headless `backend` instance unless one is passed in) is
+    set up again for each line, so keep anything needed from one position
+    before asking for the next.
+    """
+    if board is None:
+        board = backend(8, 8, 800, 800, load_images=False)
+    for fen, operations in read_positions(path):
+        turn = board.set_fen(fen)
+        yield board, turn, operations
@@ -0,0 +1,187 @@
+# Tapered piece-square-table evaluation.
+#
+# Every piece is worth material + a square bonus, once for the middlegame
+# (MG) and once for the endgame (EG). Board keeps the White-minus-Black MG and
+# EG sums and a game phase (0 = bare kings and pawns, 24 = all pieces) as
+# running totals updated by move / undo_move, so scoring a leaf only blends
+# the two sums by phase.
+#
+# evaluate_batch scores many positions at once with NumPy: positions become
+# an N x 12 x 64 tensor of piece planes and are multiplied by the same tables.
+# NumPy is only imported by the first batch call, so boards and the engine
+# start without it.
+
+np = None  # Set by _require_numpy
+
+MG_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+EG_VALUES = {'P': 120, 'N': 300, 'B': 320, 'R': 520, 'Q': 920, 'K': 0}
+PHASE_WEIGHTS = {'P': 0, 'N': 1, 'B': 1, 'R': 2, 'Q': 4, 'K': 0}
+MAX_PHASE = 24
+
+# Tables from White's side: index row * 8 + col, row 0 is the 8th rank
+# (the same layout as Board.board). Black uses the mirrored row.
+PAWN_MG = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    10,  10,  20,  30,  30,  20,  10,  10,
+     5,   5,  10,  25,  25,  10,   5,   5,
+     0,   0,   0,  20,  20,   0,   0,   0,
+     5,  -5, -10,   0,   0, -10,  -5,   5,
+     5,  10,  10, -20, -20,  10,  10,   5,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+PAWN_EG = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    80,  80,  80,  80,  80,  80,  80,  80,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    30,  30,  30,  30,  30,  30,  30,  30,
+    15,  15,  15,  15,  15,  15,  15,  15,
+     5,   5,   5,   5,   5,   5,   5,   5,
+     0,   0,   0,   0,   0,   0,   0,   0,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+KNIGHT = [
+   -50, -40, -30, -30, -30, -30, -40, -50,
+   -40, -20,   0,   0,   0,   0, -20, -40,
+   -30,   0,  10,  15,  15,  10,   0, -30,
+   -30,   5,  15,  20,  20,  15,   5, -30,
+   -30,   0,  15,  20,  20,  15,   0, -30,
+   -30,   5,  10,  15,  15,  10,   5, -30,
+   -40, -20,   0,   5,   5,   0, -20, -40,
+   -50, -40, -30, -30, -30, -30, -40, -50,
+]
+BISHOP = [
+   -20, -10, -10, -10, -10, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,  10,  10,   5,   0, -10,
+   -10,   5,   5,  10,  10,   5,   5, -10,
+   -10,   0,  10,  10,  10,  10,   0, -10,
+   -10,  10,  10,  10,  10,  10,  10, -10,
+   -10,   5,   0,   0,   0,   0,   5, -10,
+   -20, -10, -10, -10, -10, -10, -10, -20,
+]
+ROOK = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+     5,  10,  10,  10,  10,  10,  10,   5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+     0,   0,   0,   5,   5,   0,   0,   0,
+]
+QUEEN = [
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,   5,   5,   5,   0, -10,
+    -5,   0,   5,   5,   5,   5,   0,  -5,
+     0,   0,   5,   5,   5,   5,   0,  -5,
+   -10,   5,   5,   5,   5,   5,   0, -10,
+   -10,   0,   5,   0,   0,   0,   0, -10,
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+KING_MG = [
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -20, -30, -30, -40, -40, -30, -30, -20,
+   -10, -20, -20, -20, -20, -20, -20, -10,
+    20,  20,   0,   0,   0,   0,  20,  20,
+    20,  30,  10,   0,   0,  10,  30,  20,
+]
+KING_EG = [
+   -50, -40, -30, -20, -20, -30, -40, -50,
+   -30, -20, -10,   0,   0, -10, -20, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -30,   0,   0,   0,   0, -30, -30,
+   -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+PST_MG = {'P': PAWN_MG, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING_MG}
+PST_EG = {'P': PAWN_EG, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING_EG}
+
+
+def _signed_tables(values, tables):
+    # piece -> 64 signed scores (material + square), positive for White
+    signed = {}
+    for kind, table in tables.items():
+        signed['w' + kind] = [values[kind] + table[sq] for sq in range(64)]
+        signed['b' + kind] = [-(values[kind] + table[(7 - sq // 8) * 8 + sq % 8]) for sq in range(64)]
+    return signed
+
+
+MG_TABLE = _signed_tables(MG_VALUES, PST_MG)
+EG_TABLE = _signed_tables(EG_VALUES, PST_EG)
+PHASE = {color + kind: weight for color in 'wb' for kind, weight in PHASE_WEIGHTS.items()}
+
+
+def compute_scores(board):
+    """ (mg, eg, phase) for the position from scratch (seeds and verifies the running totals) """
+    mg = eg = phase = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece != "--":
+                mg += MG_TABLE[piece][row * 8 + col]
+                eg += EG_TABLE[piece][row * 8 + col]
+                phase += PHASE[piece]
+    return mg, eg, phase
+
+
+def evaluate(board, turn):
+    """ Score in centipawns from turn's point of view, O(1) from Board's running totals """
+    phase = board.phase if board.phase < MAX_PHASE else MAX_PHASE
+    score = (board.mg_score * phase + board.eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if turn == 'w' else -score
+
+
+# Batch evaluation. Plane order: white P N B R Q K, then black P N B R Q K.
+PLANE_PIECES = [color + kind for color in 'wb' for kind in 'PNBRQK']
+PLANE_INDEX = {piece: index for index, piece in enumerate(PLANE_PIECES)}
+PLANE_INDEX["--"] = len(PLANE_PIECES)  # Empty squares match no plane
+
+
+def _require_numpy():
+    # Import NumPy and build the weight vectors on first use
+    global np, MG_WEIGHTS, EG_WEIGHTS, PHASE_VECTOR
+    if np is not None:
+        return
+    try:
+        import numpy
+    except ImportError:  # Only the batch API needs NumPy
+        raise ImportError("Batch evaluation needs NumPy (pip install numpy)") from None
+    MG_WEIGHTS = numpy.array([MG_TABLE[piece] for piece in PLANE_PIECES], dtype=numpy.int64)
+    EG_WEIGHTS = numpy.array([EG_TABLE[piece] for piece in PLANE_PIECES], dtype=numpy.int64)
+    PHASE_VECTOR = numpy.array([PHASE[piece] for piece in PLANE_PIECES], dtype=numpy.int64)
+    np = numpy
+
+
+def encode_positions(boards):
+    """ N x 12 x 64 int8 piece planes for a sequence of boards (square = row * 8 + col) """
+    _require_numpy()
+    codes = np.array([[PLANE_INDEX[piece] for row in board.board for piece in row] for board in boards],
+                     dtype=np.int8).reshape(-1, 64)
+    planes = codes[:, None, :] == np.arange(len(PLANE_PIECES), dtype=np.int8)[None, :, None]
+    return planes.astype(np.int8)
+
+
+def evaluate_planes(planes, turns=None):
+    """ Scores for an N x 12 x 64 tensor, White's point of view unless turns ('w'/'b' per position) is given """
+    _require_numpy()
+    planes = np.asarray(planes, dtype=np.int64)
+    mg = np.einsum('nps,ps->n', planes, MG_WEIGHTS)
+    eg = np.einsum('nps,ps->n', planes, EG_WEIGHTS)
+    phase = np.minimum(planes.sum(axis=2) @ PHASE_VECTOR, MAX_PHASE)
+    scores = (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+    if turns is not None:
+        scores = np.where(np.array([turn == 'w' for turn in turns]), scores, -scores)
+    return scores
+
+
+def evaluate_batch(boards, turns=None):
+    """ Same numbers as evaluate() for every board, in one vectorized pass """
+    return evaluate_planes(encode_positions(boards), turns)
@@ -1,23 +1,29 @@
 import pygame
 import sys
-from Board import Board
-from sounds import MOVE_SOUND, CAPTURE_SOUND, CHECK_SOUND, CHECKMATE_SOUND
-
-pygame.init()
-pygame.font.init()
+from multiprocessing import freeze_support
+from bitboard import BitboardBoard
+from search import Searcher, SearchLimits
+from smp import ParallelSearcher
+from polyglot import OpeningBook
+from tablebase import Tablebases
 
 BOARD_SIZE = 640
 SIDE_PANEL_WIDTH = 120
 BUTTON_AREA_HEIGHT = 80
 WIDTH = BOARD_SIZE + (SIDE_PANEL_WIDTH * 2)
 HEIGHT = BOARD_SIZE + BUTTON_AREA_HEIGHT
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Chess Game")
+WIN = None  # Window surface, opened by main() so engine helper processes never open one
 
 ROWS, COLS = 8, 8
 BOARD_OFFSET_X = SIDE_PANEL_WIDTH
 BOARD_OFFSET_Y = 0
 
+AI_COLOR = None      # Set to 'w' or 'b' to let the engine play that side
+AI_MOVE_TIME = 1.0   # Seconds the engine may think per move
+AI_THREADS = 1       # Search processes for the engine (capped at the core count)
+AI_BOOK = None       # Path to a Polyglot .bin opening book the engine plays from
+TABLEBASE_DIR = None # Directory of generated .ctb tablebases (python tablebase.py)
+
 clock = pygame.time.Clock()
 
 def draw_gradient_rect(surface, color1, color2, rect):
@@ -343,6 +349,12 @@ def draw_draw_message(win, draw_reason):
         subtitle_text = "⚖ Stalemate ⚖"
     elif draw_reason == "insufficient":
         subtitle_text = "⚖ Insufficient Material ⚖"
+    elif draw_reason == "tablebase":
+        subtitle_text = "⚖ Tablebase Draw ⚖"
+    elif draw_reason == "fifty_move":
+        subtitle_text = "⚖ Fifty-Move Rule ⚖"
+    elif draw_reason == "repetition":
+        subtitle_text = "⚖ Threefold Repetition ⚖"
     else:
         subtitle_text = "🤝 Draw by Agreement 🤝"
     
@@ -396,8 +408,33 @@ def draw_draw_message(win, draw_reason):
     return [(button1_x, button_y, button_width, button_height), 
             (button2_x, button_y, button_width, button_height)]
 
+def new_searcher(board, tablebases):
+    """ The engine's searcher for one game. Its transposition table, and its
+    helper processes when AI_THREADS > 1, are kept from move to move. """
+    if AI_THREADS > 1:
+        return ParallelSearcher(board, threads=AI_THREADS, tablebases=tablebases)
+    searcher = Searcher(board)
+    searcher.tablebases = tablebases
+    return searcher
+
 def game_loop():
-    board = Board(ROWS, COLS, BOARD_SIZE, BOARD_SIZE)
+    board = BitboardBoard(ROWS, COLS, BOARD_SIZE, BOARD_SIZE)
+    book = OpeningBook(AI_BOOK) if AI_BOOK and AI_COLOR else None
+    tablebases = Tablebases(TABLEBASE_DIR) if TABLEBASE_DIR else None
+    searcher = new_searcher(board, tablebases) if AI_COLOR else None
+    try:
+        result = play_game(board, book, tablebases, searcher)
+    finally:
+        if isinstance(searcher, ParallelSearcher):
+            searcher.close()
+        if tablebases:
+            tablebases.close()
+        if book:
+            book.close()
+    # Play Again starts a new game once this one's engine is shut down
+    return game_loop() if result == 'again' else result
+
+def play_game(board, book, tablebases, searcher):
     running = True
     
     selected = None
@@ -411,6 +448,52 @@ def game_loop():
     while running:
         clock.tick(60)
         
+        # Engine move (the previous frame already shows the human's move)
+        if AI_COLOR == turn and not game_over:
+            ai_move = book.weighted_choice(board, turn) if book else None
+            if ai_move is None:
+                ai_move = searcher.search(turn, SearchLimits(movetime=AI_MOVE_TIME)).best_move
+            if ai_move:
+                start, end, promotion = ai_move
+                is_capture = board.board[end[0]][end[1]] != "--"
+                board.move(start, end, promotion or 'Q')
+                selected = None
+                valid_moves = []
+                turn = 'b' if turn == 'w' else 'w'
+                
+                status = board.game_status(turn)
+                if status == 'checkmate':
+                    game_over = True
+                    winner = 'w' if turn == 'b' else 'b'
+                    CHECKMATE_SOUND.play()
+                elif status == 'stalemate':
+                    game_over = True
+                    draw_reason = "stalemate"
+                    CHECK_SOUND.play()
+                elif status == 'insufficient':
+                    game_over = True
+                    draw_reason = "insufficient"
+                    CHECK_SOUND.play()
+                elif status == 'fifty_move' or status == 'repetition':
+                    game_over = True
+                    draw_reason = status
+                    CHECK_SOUND.play()
+                elif tablebases and tablebases.probe(board, turn) == (0, 0):
+                    game_over = True
+                    draw_reason = "tablebase"
+                    CHECK_SOUND.play()
+                elif status == 'check':
+                    CHECK_SOUND.play()
+                elif is_capture:
+                    CAPTURE_SOUND.play()
+                else:
+                    MOVE_SOUND.play()
+        
+        # Legal moves for the side to move are generated once per position, so
+        # clicks below are answered from the move cache
+        if not game_over:
+            board.legal_targets(turn)
+        
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
@@ -446,6 +529,9 @@ def game_loop():
                     if board.undo_move():
                         MOVE_SOUND.play()
                         turn = 'b' if turn == 'w' else 'w'
+                        # Against the engine, take back its reply as well
+                        if turn == AI_COLOR and board.undo_move():
+                            turn = 'b' if turn == 'w' else 'w'
                         selected = None
                         valid_moves = []
                     continue
@@ -467,19 +553,28 @@ def game_loop():
                             valid_moves = []
                             turn = 'b' if turn == 'w' else 'w'
                             
-                            if board.is_checkmate(turn):
+                            status = board.game_status(turn)
+                            if status == 'checkmate':
                                 game_over = True
                                 winner = 'w' if turn == 'b' else 'b'
                                 CHECKMATE_SOUND.play()
-                            elif board.is_stalemate(turn):
+                            elif status == 'stalemate':
                                 game_over = True
                                 draw_reason = "stalemate"
                                 CHECK_SOUND.play()
-                            elif board.is_insufficient_material():
+                            elif status == 'insufficient':
                                 game_over = True
                                 draw_reason = "insufficient"
                                 CHECK_SOUND.play()
-                            elif board.is_in_check(turn):
+                            elif status == 'fifty_move' or status == 'repetition':
+                                game_over = True
+                                draw_reason = status
+                                CHECK_SOUND.play()
+                            elif tablebases and tablebases.probe(board, turn) == (0, 0):
+                                game_over = True
+                                draw_reason = "tablebase"
+                                CHECK_SOUND.play()
+                            elif status == 'check':
                                 CHECK_SOUND.play()
                             elif is_capture:
                                 CAPTURE_SOUND.play()
@@ -539,14 +634,20 @@ def game_loop():
                     if buttons[1][0] <= pos[0] <= buttons[1][0] + buttons[1][2] and \
                        buttons[1][1] <= pos[1] <= buttons[1][1] + buttons[1][3]:
                         MOVE_SOUND.play()
-                        # Restart game loop
-                        return game_loop()
+                        return 'again'  # Restart game loop
             
         pygame.display.flip()
     
     return True
 
 def main():
+    global WIN, MOVE_SOUND, CAPTURE_SOUND, CHECK_SOUND, CHECKMATE_SOUND
+    pygame.init()
+    pygame.font.init()
+    WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Chess Game")
+    from sounds import MOVE_SOUND, CAPTURE_SOUND, CHECK_SOUND, CHECKMATE_SOUND  # Opens the mixer
+
     running = True
     in_game = False
     
@@ -579,22 +680,17 @@ def main():
     sys.exit()
 
 if __name__ == "__main__":
+    freeze_support()  # Frozen executables start engine helpers through this script
     main()
 
 import sys
-from Board import Board
-from sounds import MOVE_SOUND, CAPTURE_SOUND, CHECK_SOUND, CHECKMATE_SOUND
-
-pygame.init()
-pygame.font.init()
 
 BOARD_SIZE = 640
 SIDE_PANEL_WIDTH = 120
 BUTTON_AREA_HEIGHT = 80
 WIDTH = BOARD_SIZE + (SIDE_PANEL_WIDTH * 2)
 HEIGHT = BOARD_SIZE + BUTTON_AREA_HEIGHT
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Chess Game")
+WIN = None  # Window surface, opened by main()
 
 ROWS, COLS = 8, 8
 BOARD_OFFSET_X = SIDE_PANEL_WIDTH
@@ -830,6 +926,10 @@ def draw_draw_message(win, draw_reason):
         subtitle_text = "Stalemate"
     elif draw_reason == "insufficient":
         subtitle_text = "Insufficient Material"
+    elif draw_reason == "fifty_move":
+        subtitle_text = "Fifty-Move Rule"
+    elif draw_reason == "repetition":
+        subtitle_text = "Threefold Repetition"
     else:
         subtitle_text = "Draw by Agreement"
     
@@ -838,7 +938,7 @@ def draw_draw_message(win, draw_reason):
     win.blit(subtitle, subtitle_rect)
 
 def game_loop():
-    board = Board(ROWS, COLS, BOARD_SIZE, BOARD_SIZE)
+    board = BitboardBoard(ROWS, COLS, BOARD_SIZE, BOARD_SIZE)
     running = True
     
     selected = None
@@ -851,6 +951,11 @@ def game_loop():
     while running:
         clock.tick(60)
         
+        # Legal moves for the side to move are generated once per position, so
+        # clicks below are answered from the move cache
+        if not game_over:
+            board.legal_targets(turn)
+        
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
@@ -896,19 +1001,24 @@ def game_loop():
                             turn = 'b' if turn == 'w' else 'w'
                             
                             # Check for checkmate first
-                            if board.is_checkmate(turn):
+                            status = board.game_status(turn)
+                            if status == 'checkmate':
                                 game_over = True
                                 winner = 'w' if turn == 'b' else 'b'
                                 CHECKMATE_SOUND.play()
-                            elif board.is_stalemate(turn):
+                            elif status == 'stalemate':
                                 game_over = True
                                 draw_reason = "stalemate"
                                 CHECK_SOUND.play()
-                            elif board.is_insufficient_material():
+                            elif status == 'insufficient':
                                 game_over = True
                                 draw_reason = "insufficient"
                                 CHECK_SOUND.play()
-                            elif board.is_in_check(turn):
+                            elif status == 'fifty_move' or status == 'repetition':
+                                game_over = True
+                                draw_reason = status
+                                CHECK_SOUND.play()
+                            elif status == 'check':
                                 CHECK_SOUND.play()
                             elif is_capture:
                                 CAPTURE_SOUND.play()
@@ -945,6 +1055,13 @@ def game_loop():
     return True
 
 def main():
+    global WIN, MOVE_SOUND, CAPTURE_SOUND, CHECK_SOUND, CHECKMATE_SOUND
+    pygame.init()
+    pygame.font.init()
+    WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Chess Game")
+    from sounds import MOVE_SOUND, CAPTURE_SOUND, CHECK_SOUND, CHECKMATE_SOUND  # Opens the mixer
+
     running = True
     in_game = False
     
@@ -977,4 +1094,5 @@ def main():
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    freeze_support()
+    main()
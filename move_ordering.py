@@ -0,0 +1,105 @@
+# Move ordering for alpha-beta searches over Board.
+#
+# Order: hash move, captures and promotions by MVV-LVA (most valuable victim,
+# least valuable attacker), the two killer moves of this ply, then quiet moves
+# by their history score. Cutoff statistics per ply show how often the first
+# move searched was already good enough to cut.
+
+MAX_PLY = 64
+
+# Ranks used by MVV-LVA (a pawn taking a queen beats a queen taking a pawn)
+PIECE_RANK = {'P': 1, 'N': 2, 'B': 3, 'R': 4, 'Q': 5, 'K': 6}
+
+HASH_MOVE_SCORE = 1000000
+CAPTURE_SCORE = 100000
+KILLER_SCORES = (90000, 89000)
+HISTORY_LIMIT = 80000  # History stays below the killers
+
+
+class MoveOrderer:
+    def __init__(self, max_ply=MAX_PLY):
+        self.max_ply = max_ply
+        self.killers = [[None, None] for _ in range(max_ply + 1)]
+        # history[color][from_sq][to_sq], from/to as row * 8 + col
+        self.history = {color: [[0] * 64 for _ in range(64)] for color in 'wb'}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.cutoffs = [0] * (self.max_ply + 1)
+        self.first_move_cutoffs = [0] * (self.max_ply + 1)
+
+    def new_search(self):
+        # Killers are position specific, history only fades
+        for ply_killers in self.killers:
+            ply_killers[0] = ply_killers[1] = None
+        for table in self.history.values():
+            for row in table:
+                for to_sq in range(64):
+                    row[to_sq] >>= 1
+        self.reset_stats()
+
+    def is_capture(self, board, move):
+        start, end, promotion = move
+        if board.board[end[0]][end[1]] != "--":
+            return True
+        # En passant: a pawn changing file onto an empty square
+        return board.board[start[0]][start[1]][1] == 'P' and start[1] != end[1]
+
+    def score_move(self, board, move, ply, hash_move):
+        if move == hash_move:
+            return HASH_MOVE_SCORE
+        start, end, promotion = move
+        piece = board.board[start[0]][start[1]]
+        target = board.board[end[0]][end[1]]
+        if target != "--":
+            return CAPTURE_SCORE + PIECE_RANK[target[1]] * 10 - PIECE_RANK[piece[1]] + (PIECE_RANK[promotion] * 10 if promotion else 0)
+        if promotion:
+            return CAPTURE_SCORE + PIECE_RANK[promotion] * 10 - 6
+        if piece[1] == 'P' and start[1] != end[1]:
+            return CAPTURE_SCORE + 10 - 1  # En passant, pawn takes pawn
+        killers = self.killers[ply]
+        if move == killers[0]:
+            return KILLER_SCORES[0]
+        if move == killers[1]:
+            return KILLER_SCORES[1]
+        return self.history[piece[0]][start[0] * 8 + start[1]][end[0] * 8 + end[1]]
+
+    def order_moves(self, board, moves, ply=0, hash_move=None):
+        """ moves sorted best-first (a new list) """
+        scores = {move: self.score_move(board, move, ply, hash_move) for move in moves}
+        return sorted(moves, key=scores.__getitem__, reverse=True)
+
+    def record_cutoff(self, board, move, ply, depth, index):
+        """ Call with the board at the node itself (`move` already undone) """
+        self.cutoffs[ply] += 1
+        if index == 0:
+            self.first_move_cutoffs[ply] += 1
+        if self.is_capture(board, move) or move[2]:
+            return  # Captures and promotions are already ordered by MVV-LVA
+
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        start, end, promotion = move
+        color = board.board[start[0]][start[1]][0]
+        row = self.history[color][start[0] * 8 + start[1]]
+        row[end[0] * 8 + end[1]] += depth * depth
+        if row[end[0] * 8 + end[1]] > HISTORY_LIMIT:
+            for table in self.history.values():
+                for from_row in table:
+                    for to_sq in range(64):
+                        from_row[to_sq] >>= 1
+
+    def cutoff_stats(self):
+        """ [(ply, cutoffs, fraction caused by the first move)] for plies that had cutoffs """
+        stats = []
+        for ply in range(self.max_ply + 1):
+            if self.cutoffs[ply]:
+                stats.append((ply, self.cutoffs[ply], self.first_move_cutoffs[ply] / self.cutoffs[ply]))
+        return stats
+
+    def first_move_rate(self):
+        total = sum(self.cutoffs)
+        return sum(self.first_move_cutoffs) / total if total else 0.0
@@ -0,0 +1,154 @@
+import re
+
+# SAN and UCI text for Board moves ((start, end, promotion) tuples).
+#
+#   move_to_san(board, 'w', ((7, 6), (5, 5), None))    # 'Nf3'
+#   move_to_uci(((6, 4), (4, 4), None))                # 'e2e4'
+#   sans = notate_line(board, 'w', moves)              # a whole game, one pass
+#
+# Disambiguation and parsing read Board.legal_targets, which is generated once
+# per position and cached by position key, so notating every move of a
+# position (or a position seen again) costs no further move generation.
+
+SAN = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+UCI = re.compile(r'([a-h][1-8])([a-h][1-8])([nbrq])?$')
+FILES = "abcdefgh"
+CASTLES = {'O-O': 6, '0-0': 6, 'O-O-O': 2, '0-0-0': 2}  # King's target column
+
+
+class IllegalMoveError(ValueError):
+    pass
+
+
+def square_name(square):
+    return FILES[square[1]] + str(8 - square[0])
+
+
+def parse_square(name):
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def move_to_uci(move):
+    start, end, promotion = move
+    text = square_name(start) + square_name(end)
+    if promotion:
+        text += promotion.lower()
+    return text
+
+
+def parse_uci(board, turn, text):
+    """ The legal move written `text` in UCI (e.g. 'e7e8q') with `turn` to move """
+    match = UCI.match(text)
+    if not match:
+        raise IllegalMoveError(f"Unreadable move {text!r}")
+    start, end = parse_square(match.group(1)), parse_square(match.group(2))
+    if end not in board.legal_targets(turn).get(start, ()):
+        raise IllegalMoveError(f"Illegal move {text!r}")
+    return start, end, _promotion(board, start, end, match.group(3) and match.group(3).upper(), text)
+
+
+def parse_san(board, turn, san):
+    """ The legal move `san` stands for with `turn` to move """
+    text = san.rstrip('+#!?')
+    targets = board.legal_targets(turn)
+    if text in CASTLES:
+        king = board.white_king_location if turn == 'w' else board.black_king_location
+        end = (king[0], CASTLES[text])
+        if board.board[king[0]][king[1]][1] != 'K' or end not in targets.get(king, ()) or \
+           abs(king[1] - end[1]) != 2:
+            raise IllegalMoveError(f"Illegal castling {san!r}")
+        return king, end, None
+
+    match = SAN.match(text)
+    if not match:
+        raise IllegalMoveError(f"Unreadable move {san!r}")
+    kind, from_file, from_rank, target, promotion = match.groups()
+    kind = kind or 'P'
+    end = parse_square(target)
+    found = []
+    for start, ends in targets.items():
+        if end not in ends or board.board[start[0]][start[1]][1] != kind:
+            continue
+        if from_file and FILES[start[1]] != from_file:
+            continue
+        if from_rank and str(8 - start[0]) != from_rank:
+            continue
+        found.append(start)
+    if len(found) != 1:
+        raise IllegalMoveError(f"{'Ambiguous' if found else 'Illegal'} move {san!r}")
+    return found[0], end, _promotion(board, found[0], end, promotion, san)
+
+
+def _promotion(board, start, end, promotion, text):
+    # Promotions share one target square in legal_targets; a pawn reaching the
+    # last rank without a piece given becomes a queen, as Board.move does
+    if board.board[start[0]][start[1]][1] == 'P' and end[0] in (0, 7):
+        return promotion or 'Q'
+    if promotion:
+        raise IllegalMoveError(f"Promotion piece on a move that does not promote {text!r}")
+    return None
+
+
+def move_to_san(board, turn, move, check=None):
+    """ SAN of the legal move `move` with `turn` to move. `check` is '', '+' or '#'
+    when the caller already knows it; otherwise the move is made to find out. """
+    start, end, promotion = move
+    piece = board.board[start[0]][start[1]]
+    if piece[1] == 'K' and abs(start[1] - end[1]) == 2:
+        san = 'O-O' if end[1] == 6 else 'O-O-O'
+    else:
+        capture = board.board[end[0]][end[1]] != "--" or (piece[1] == 'P' and start[1] != end[1])
+        if piece[1] == 'P':
+            san = (FILES[start[1]] + 'x' if capture else '') + square_name(end)
+            if promotion:
+                san += '=' + promotion
+        else:
+            san = piece[1] + _disambiguation(board, turn, piece, start, end) + \
+                ('x' if capture else '') + square_name(end)
+
+    if check is None:
+        other = 'b' if turn == 'w' else 'w'
+        board.move(start, end, promotion or 'Q')
+        check = _check_suffix(board, other)
+        board.undo_move()
+    return san + check
+
+
+def _disambiguation(board, turn, piece, start, end):
+    # File, rank or square of `start` as needed to tell it from other `piece`s
+    # that can also reach `end`
+    same_file = same_rank = False
+    ambiguous = False
+    for other, ends in board.legal_targets(turn).items():
+        if other == start or end not in ends or board.board[other[0]][other[1]] != piece:
+            continue
+        ambiguous = True
+        same_file = same_file or other[1] == start[1]
+        same_rank = same_rank or other[0] == start[0]
+    if not ambiguous:
+        return ''
+    if not same_file:
+        return FILES[start[1]]
+    if not same_rank:
+        return str(8 - start[0])
+    return square_name(start)
+
+
+def _check_suffix(board, turn):
+    # '+', '#' or '' for the side to move in the current position
+    if not board.is_in_check(turn):
+        return ''
+    return '#' if board.game_status(turn) == 'checkmate' else '+'
+
+
+def notate_line(board, turn, moves):
+    """ SAN for each of `moves`, played in order from the current position (the
+    moves stay on the board). Each move is made once; disambiguation needs at most
+    one legal move generation per position and mate is only tested after checks. """
+    sans = []
+    for start, end, promotion in moves:
+        sans.append(move_to_san(board, turn, (start, end, promotion), check=''))
+        board.move(start, end, promotion or 'Q')
+        turn = 'b' if turn == 'w' else 'w'
+        sans[-1] += _check_suffix(board, turn)
+    return sans
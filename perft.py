@@ -0,0 +1,169 @@
+import argparse
+import sys
+import time
+from multiprocessing import Pool
+
+from Board import Board, START_FEN
+from bitboard import BitboardBoard
+from epd import read_positions
+from notation import move_to_uci
+
+# Headless perft: counts leaf nodes of the legal move tree to check the rules
+# engine (move / undo_move / generate_legal_moves) and measure its speed.
+#
+#   python perft.py --depth 4                 # start position
+#   python perft.py --fen "<fen>" --depth 5 --divide --jobs 4
+#   python perft.py --suite --max-nodes 2000000
+#   python perft.py --epd perftsuite.epd        # lines like "<fen> ;D1 20 ;D2 400"
+
+# Standard reference positions (chessprogramming.org "Perft Results")
+# with the known node counts for depth 1, 2, 3, ...
+REFERENCE_POSITIONS = [
+    ("start", START_FEN,
+     [20, 400, 8902, 197281, 4865609, 119060324]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603, 193690690]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624, 11030083]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333, 15833292]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487, 89941194]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594, 164075551]),
+]
+
+BACKENDS = {
+    'mailbox': Board,
+    'bitboard': BitboardBoard,
+}
+
+
+def new_board(backend, fen):
+    return BACKENDS[backend].from_fen(fen)
+
+
+def perft(board, turn, depth):
+    if depth == 0:
+        return 1
+    moves = board.generate_legal_moves(turn)
+    if depth == 1:
+        return len(moves)  # Bulk count, the leaves are never made
+
+    other = 'b' if turn == 'w' else 'w'
+    nodes = 0
+    for start, end, promotion in moves:
+        board.move(start, end, promotion or 'Q')
+        nodes += perft(board, other, depth - 1)
+        board.undo_move()
+    return nodes
+
+
+def _perft_root_move(args):
+    # Worker entry point: each task builds its own board, so only the
+    # FEN and the move travel to the process and only a count comes back
+    backend, fen, move, depth = args
+    board, turn = new_board(backend, fen)
+    start, end, promotion = move
+    board.move(start, end, promotion or 'Q')
+    return perft(board, 'b' if turn == 'w' else 'w', depth - 1)
+
+
+def divide(fen, depth, backend='bitboard', jobs=1):
+    """ Perft split by root move; returns [(move, nodes)] in move generation order.
+    depth must be 1 or more (at depth 0 there are no moves to split by). """
+    if depth < 1:
+        raise ValueError(f"divide needs depth >= 1, got {depth}")
+    board, turn = new_board(backend, fen)
+    moves = board.generate_legal_moves(turn)
+    if depth == 1:
+        return [(move, 1) for move in moves]
+
+    tasks = [(backend, fen, move, depth) for move in moves]
+    if jobs > 1:
+        with Pool(jobs) as pool:
+            counts = pool.map(_perft_root_move, tasks, chunksize=1)
+    else:
+        counts = [_perft_root_move(task) for task in tasks]
+    return list(zip(moves, counts))
+
+
+def run(fen, depth, backend='bitboard', jobs=1, show_divide=False):
+    t0 = time.perf_counter()
+    if depth == 0:
+        new_board(backend, fen)  # Still reports a bad FEN
+        results = []
+        nodes = 1  # Just the root
+    else:
+        results = divide(fen, depth, backend, jobs)
+        nodes = sum(count for move, count in results)
+    elapsed = time.perf_counter() - t0
+
+    if show_divide and results:
+        for move, count in sorted(results, key=lambda item: move_to_uci(item[0])):
+            print(f"{move_to_uci(move)}: {count}")
+        print()
+    nps = nodes / elapsed if elapsed > 0 else 0
+    print(f"depth {depth}  nodes {nodes}  time {elapsed:.2f}s  nps {nps:,.0f}")
+    return nodes
+
+
+def epd_suite(path):
+    """ (name, fen, expected counts) for each line of an EPD file with D1, D2, ... operations """
+    positions = []
+    for number, (fen, operations) in enumerate(read_positions(path), start=1):
+        expected = []
+        while f"D{len(expected) + 1}" in operations:
+            expected.append(int(operations[f"D{len(expected) + 1}"]))
+        positions.append((operations.get("id", f"line {number}"), fen, expected))
+    return positions
+
+
+def run_suite(backend='bitboard', jobs=1, max_nodes=1000000, max_depth=None, positions=REFERENCE_POSITIONS):
+    # Runs every reference position up to the deepest depth whose expected
+    # count stays under max_nodes; returns False on any mismatch
+    ok = True
+    total_nodes = 0
+    t0 = time.perf_counter()
+    for name, fen, expected in positions:
+        for depth, want in enumerate(expected, start=1):
+            if want > max_nodes or (max_depth and depth > max_depth):
+                break
+            t1 = time.perf_counter()
+            got = sum(count for move, count in divide(fen, depth, backend, jobs))
+            elapsed = time.perf_counter() - t1
+            total_nodes += got
+            status = "ok" if got == want else f"FAIL (expected {want})"
+            print(f"{name:<11} depth {depth}  nodes {got:>10}  {elapsed:6.2f}s  {status}")
+            if got != want:
+                ok = False
+    elapsed = time.perf_counter() - t0
+    nps = total_nodes / elapsed if elapsed > 0 else 0
+    print(f"\n{'passed' if ok else 'FAILED'}  nodes {total_nodes}  time {elapsed:.2f}s  nps {nps:,.0f}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft node counts for the chess rules engine")
+    parser.add_argument("--fen", default=START_FEN, help="position to search (default: start position)")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--divide", action="store_true", help="print the node count below each root move")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes, root moves are split across them")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default='bitboard')
+    parser.add_argument("--suite", action="store_true", help="check all reference positions")
+    parser.add_argument("--epd", help="check the positions of an EPD file with D1, D2, ... node counts")
+    parser.add_argument("--max-nodes", type=int, default=1000000, help="suite: skip depths with more nodes than this")
+    args = parser.parse_args(argv)
+    if args.depth < 0:
+        parser.error("--depth must be 0 or more")
+
+    if args.suite:
+        return 0 if run_suite(args.backend, args.jobs, args.max_nodes) else 1
+    if args.epd:
+        return 0 if run_suite(args.backend, args.jobs, args.max_nodes, positions=epd_suite(args.epd)) else 1
+    run(args.fen, args.depth, args.backend, args.jobs, args.divide)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
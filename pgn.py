@@ -0,0 +1,172 @@
+import re
+
+from Board import Board, START_FEN, decode_move
+from notation import IllegalMoveError, parse_san, notate_line
+
+# PGN reading and writing on top of Board.
+#
+#   for game in read_games('games.pgn'):          # one game in memory at a time
+#       board, turn = replay(game)                # SAN resolved by notation.parse_san
+#
+#   text = write_game(board, {'White': 'Me', 'Black': 'Engine'})
+#
+# Only the main line is kept: comments, NAGs and variations are skipped while
+# reading.
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+ROSTER = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')  # Tags written first, in this order
+
+TAG = re.compile(r'\[\s*(\w+)\s+"(.*)"\s*\]$')  # Greedy: tolerates unescaped quotes in the value
+TOKEN = re.compile(r'[{}();]|\$\d+|\d+\.(?:\.\.)?|[^\s{}();]+')
+
+
+class PGNError(ValueError):
+    pass
+
+
+class Game:
+    def __init__(self):
+        self.headers = {}  # Tag pairs in file order
+        self.moves = []    # Main line as SAN strings
+        self.result = '*'
+
+    def __repr__(self):
+        return f"Game({self.headers.get('White', '?')} - {self.headers.get('Black', '?')}, {len(self.moves)} moves, {self.result})"
+
+
+def read_games(source):
+    """ Yield a Game for every game in a PGN file (a path or an open text file),
+    reading it one line at a time """
+    f = open(source, encoding='utf-8', errors='replace') if isinstance(source, str) else source
+    try:
+        game = None
+        in_comment = False
+        depth = 0  # Variation nesting
+        for line in f:
+            if not in_comment and line.lstrip().startswith('['):
+                tag = TAG.match(line.strip())
+                if tag:
+                    if game is not None and game.moves:
+                        yield game  # No result token before the next game
+                        game = None
+                    if game is None:
+                        game = Game()
+                    game.headers[tag.group(1)] = tag.group(2).replace('\\"', '"').replace('\\\\', '\\')
+                    continue
+            if line.startswith('%'):
+                continue  # Escaped line
+
+            for token in TOKEN.findall(line):
+                if in_comment:
+                    in_comment = token != '}'
+                elif token == '{':
+                    in_comment = True
+                elif token == ';':
+                    break  # Comment to the end of the line
+                elif token == '(':
+                    depth += 1
+                elif token == ')':
+                    depth = max(depth - 1, 0)
+                elif depth or token[0] == '$' or (token[0].isdigit() and token[-1] == '.'):
+                    continue  # Inside a variation, NAG or move number
+                elif token in RESULTS:
+                    if game is None:
+                        game = Game()
+                    game.result = token
+                    yield game
+                    game = None
+                else:
+                    if game is None:
+                        game = Game()
+                    game.moves.append(token)
+        if game is not None and (game.moves or game.headers):
+            yield game
+    finally:
+        if f is not source:
+            f.close()
+
+
+def replay(game, board=None, backend=Board):
+    """ Play `game` through Board.move, on `board` or a new headless `backend`
+    board; returns (board, turn). Raises PGNError at the first bad move. """
+    fen = game.headers.get('FEN', START_FEN)
+    if board is None:
+        board, turn = backend.from_fen(fen)
+    else:
+        turn = board.set_fen(fen)
+    for number, san in enumerate(game.moves):
+        try:
+            start, end, promotion = parse_san(board, turn, san)
+        except IllegalMoveError as e:
+            raise PGNError(f"{e} at ply {number + 1}") from None
+        board.move(start, end, promotion or 'Q')
+        turn = 'b' if turn == 'w' else 'w'
+    return board, turn
+
+
+def game_result(board, turn):
+    """ PGN result for the current position with `turn` to move ('*' if the game goes on) """
+    status = board.game_status(turn)
+    if status == 'checkmate':
+        return '0-1' if turn == 'w' else '1-0'
+    if status in ('stalemate', 'insufficient', 'fifty_move', 'repetition'):
+        return '1/2-1/2'
+    return '*'
+
+
+def write_game(board, headers=None, result=None):
+    """ PGN text for the moves in board.move_log. They are taken back and
+    replayed to write their SAN, which leaves the board as it was. The
+    result is read from the final position unless given. """
+    moves = []
+    for record in board.move_log:
+        moves.append(decode_move(record.move))
+    for _ in moves:
+        board.undo_move()
+    turn = 'b' if board.start_ply % 2 else 'w'
+    start_fen = board.to_fen(turn)
+    first_move = board.start_ply // 2 + 1
+
+    sans = notate_line(board, turn, moves)
+    if len(moves) % 2:
+        turn = 'b' if turn == 'w' else 'w'
+    if result is None:
+        result = game_result(board, turn)
+
+    tags = dict(headers or {})
+    tags['Result'] = result
+    if start_fen != START_FEN:
+        tags['SetUp'] = '1'
+        tags['FEN'] = start_fen
+    lines = []
+    for name in ROSTER:
+        value = tags.pop(name, '????.??.??' if name == 'Date' else '?')
+        lines.append(f'[{name} "{_escape(value)}"]')
+    for name, value in tags.items():
+        lines.append(f'[{name} "{_escape(value)}"]')
+    lines.append('')
+
+    # Movetext, wrapped below 80 columns
+    words = []
+    ply = board.start_ply
+    for index, san in enumerate(sans):
+        if ply % 2 == 0:
+            words.append(f"{ply // 2 + 1}.")
+        elif index == 0:
+            words.append(f"{first_move}...")
+        words.append(san)
+        ply += 1
+    words.append(result)
+    line = ''
+    for word in words:
+        if line and len(line) + 1 + len(word) > 79:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
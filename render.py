@@ -0,0 +1,106 @@
+import os
+
+import pygame
+
+from Board import resource_path
+
+# Drawing for Board: piece sprites, squares, the selection and move dots.
+# The rules in Board.py never import pygame; only this module does, and only
+# the GUI calls into it.
+#
+#   render.draw_board(win, board, selected, valid_moves)
+#   sprites = render.piece_sprites(board.SQ_SIZE)     # {'wK': Surface, ...}
+#
+# Sprites are loaded on first use and shared by every board with the same
+# square size, so a new game or a second board loads nothing.
+
+SPRITE_SHEET = 'chess_pieces_16x16_onebit/pieces.png'  # 6 x 2 sheet of K Q B R N P, White on top
+SVG_DIR = 'pieces-svg(1)'  # One file per piece, used when the sheet is not there
+SHEET_ORDER = ["K", "Q", "B", "R", "N", "P"]
+SVG_NAMES = {'K': 'king', 'Q': 'queen', 'B': 'bishop', 'R': 'rook', 'N': 'knight', 'P': 'pawn'}
+
+LIGHT = (240, 217, 181)
+DARK = (181, 136, 99)
+HIGHLIGHT = (0, 255, 0)
+DOT = (128, 128, 128, 150)
+DOT_RADIUS = 10
+
+_sprites = {}  # Square size -> {piece: Surface}
+
+
+def _load(path):
+    image = pygame.image.load(path)
+    # convert_alpha needs a display mode; without one the plain image still draws
+    return image.convert_alpha() if pygame.display.get_surface() else image
+
+
+def _source_images():
+    # Unscaled image of every piece, from the sprite sheet or else the SVG set
+    sheet_path = resource_path(SPRITE_SHEET)
+    if not os.path.exists(sheet_path):
+        return {color + kind: _load(resource_path(os.path.join(SVG_DIR, f"{name}-{color}.svg")))
+                for kind, name in SVG_NAMES.items() for color in 'wb'}
+    sheet = _load(sheet_path)
+    # Sprite size comes from the image dimensions
+    sheet_width, sheet_height = sheet.get_size()
+    sprite_w = sheet_width // 6
+    sprite_h = sheet_height // 2
+    images = {}
+    for idx, kind in enumerate(SHEET_ORDER):
+        images['w' + kind] = sheet.subsurface(pygame.Rect(idx * sprite_w, 0, sprite_w, sprite_h)).copy()
+        images['b' + kind] = sheet.subsurface(pygame.Rect(idx * sprite_w, sprite_h, sprite_w, sprite_h)).copy()
+    return images
+
+
+def piece_sprites(size):
+    """ {piece: Surface} scaled to `size` pixels, loaded once per size """
+    sprites = _sprites.get(size)
+    if sprites is None:
+        sprites = {piece: pygame.transform.smoothscale(image, (size, size))
+                   for piece, image in _source_images().items()}
+        _sprites[size] = sprites
+    return sprites
+
+
+def draw_squares(win, board):
+    win.fill((255, 255, 255))
+    size = board.SQ_SIZE
+    for row in range(board.ROWS):
+        for col in range(board.COLS):
+            color = LIGHT if (row + col) % 2 == 0 else DARK
+            pygame.draw.rect(win, color, (col * size, row * size, size, size))
+
+
+def draw_pieces(win, board):
+    size = board.SQ_SIZE
+    sprites = piece_sprites(size)
+    for row in range(board.ROWS):
+        for col in range(board.COLS):
+            piece = board.board[row][col]
+            if piece in sprites:
+                win.blit(sprites[piece], (col * size, row * size))
+
+
+def draw_highlight(win, board, selected):
+    if selected:
+        row, col = selected
+        size = board.SQ_SIZE
+        pygame.draw.rect(win, HIGHLIGHT, (col * size, row * size, size, size), 4)
+
+
+def draw_valid_moves(win, board, moves):
+    if not moves:
+        return
+    size = board.SQ_SIZE
+    # One transparent dot surface serves every target square
+    dot = pygame.Surface((size, size), pygame.SRCALPHA)
+    pygame.draw.circle(dot, DOT, (size // 2, size // 2), DOT_RADIUS)
+    for row, col in moves:
+        win.blit(dot, (col * size, row * size))
+
+
+def draw_board(win, board, selected=None, valid_moves=None):
+    draw_squares(win, board)
+    draw_highlight(win, board, selected)
+    draw_pieces(win, board)
+    draw_valid_moves(win, board, valid_moves)
@@ -0,0 +1,258 @@
+import time
+
+from transposition import TranspositionTable, EXACT, LOWER, UPPER, score_to_tt, score_from_tt
+from move_ordering import MoveOrderer
+from see import see
+from evaluation import evaluate
+
+# Negamax alpha-beta search over Board with iterative deepening.
+#
+#   result = Searcher(board).search('b', SearchLimits(movetime=1.0))
+#   start, end, promotion = result.best_move
+#
+# Moves are the (start, end, promotion) tuples from Board.generate_legal_moves.
+# Scores are in centipawns from the side to move's point of view.
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000  # Anything above this is a forced mate
+INFINITY = MATE_SCORE + 1
+MAX_PLY = 64
+
+CHECK_EVERY = 256  # Nodes between clock checks
+
+
+class SearchLimits:
+    """ Budget for one search: stop at whichever limit is hit first """
+
+    def __init__(self, depth=MAX_PLY, nodes=None, movetime=None):
+        self.depth = depth          # Maximum iterative deepening depth
+        self.nodes = nodes          # Node budget
+        self.movetime = movetime    # Seconds
+
+
+class SearchResult:
+    def __init__(self):
+        self.best_move = None
+        self.score = 0
+        self.depth = 0
+        self.nodes = 0
+        self.time = 0.0
+        self.pv = []
+
+    def __repr__(self):
+        return f"SearchResult(depth={self.depth}, score={self.score}, nodes={self.nodes}, pv={self.pv})"
+
+
+class SearchAborted(Exception):
+    pass
+
+
+class Searcher:
+    def __init__(self, board, tt=None, hash_mb=16):
+        self.board = board
+        self.tt = tt if tt is not None else TranspositionTable(hash_mb)
+        self.orderer = MoveOrderer(MAX_PLY)
+        self.nodes = 0
+        self.qnodes = 0
+        self.see_pruned = 0
+        self.deadline = None
+        self.node_limit = None
+        self.next_check = CHECK_EVERY
+        self.stopped = False
+        self.on_iteration = None  # Optional callback(result) after each completed depth
+        self.stop_event = None    # Optional multiprocessing.Event, polled like stop()
+        self.tablebases = None    # Optional tablebase.Tablebases for exact endgame scores
+        self.tb_hits = 0
+        self.pv_table = [[None] * MAX_PLY for _ in range(MAX_PLY + 1)]
+        self.pv_length = [0] * (MAX_PLY + 1)
+
+    def stop(self):
+        """ Ask a running search to return as soon as possible (safe from another thread) """
+        self.stopped = True
+
+    def search(self, turn, limits=None, first_depth=1):
+        limits = limits or SearchLimits()
+        start_time = time.perf_counter()
+        self.nodes = 0
+        self.qnodes = 0
+        self.see_pruned = 0
+        self.tb_hits = 0
+        self.stopped = False
+        self.node_limit = limits.nodes
+        self.next_check = min(CHECK_EVERY, limits.nodes) if limits.nodes else CHECK_EVERY
+        self.deadline = start_time + limits.movetime if limits.movetime else None
+        self.tt.new_search()
+        self.orderer.new_search()
+
+        result = SearchResult()
+        root_moves = self.board.generate_legal_moves(turn)
+        if not root_moves:
+            return result
+        result.best_move = root_moves[0]  # Something to play even if depth 1 never finishes
+
+        root_depth = len(self.board.move_log)
+        for depth in range(min(first_depth, limits.depth), max(1, min(limits.depth, MAX_PLY)) + 1):
+            try:
+                score = self.negamax(turn, depth, -INFINITY, INFINITY, 0)
+            except SearchAborted:
+                # Unwind whatever the interrupted iteration left on the board
+                while len(self.board.move_log) > root_depth:
+                    self.board.undo_move()
+                break
+
+            result.depth = depth
+            result.score = score
+            result.pv = self.pv_table[0][:self.pv_length[0]]
+            if result.pv:
+                result.best_move = result.pv[0]
+            result.nodes = self.nodes
+            result.time = time.perf_counter() - start_time
+            if self.on_iteration:
+                self.on_iteration(result)
+            if abs(score) >= MATE_THRESHOLD:
+                break  # Mate found, deeper iterations cannot improve it
+
+        result.nodes = self.nodes
+        result.time = time.perf_counter() - start_time
+        return result
+
+    def _check_limits(self):
+        self.next_check = self.nodes + CHECK_EVERY
+        if self.node_limit is not None:
+            self.next_check = min(self.next_check, self.node_limit)
+        if self.stopped or (self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchAborted()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted()
+
+    def negamax(self, turn, depth, alpha, beta, ply):
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(turn, alpha, beta, ply)
+
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self._check_limits()
+        self.pv_length[ply] = 0
+
+        board = self.board
+        if ply > 0 and (board.halfmove_clock >= 100 or board.is_repetition()):
+            return 0  # A repeated position is scored as the draw it leads to
+
+        if self.tablebases is not None and ply > 0 and board.phase <= 4:
+            entry = self.tablebases.probe(board, turn)  # Phase filters out anything with more than a queen
+            if entry is not None:
+                self.tb_hits += 1
+                wdl, plies = entry
+                if wdl > 0:
+                    return MATE_SCORE - ply - plies
+                if wdl < 0:
+                    return -MATE_SCORE + ply + plies
+                return 0
+
+        key = board.zobrist_key
+        hash_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, bound, tt_score, hash_move = entry
+            if ply > 0 and tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if bound == EXACT or (bound == LOWER and tt_score >= beta) or \
+                   (bound == UPPER and tt_score <= alpha):
+                    return tt_score
+
+        moves = board.generate_legal_moves(turn)
+        if not moves:
+            if board.is_in_check(turn):
+                return -MATE_SCORE + ply  # Prefer the quickest mate
+            return 0  # Stalemate
+
+        moves = self.orderer.order_moves(board, moves, ply, hash_move)
+
+        other = 'b' if turn == 'w' else 'w'
+        alpha_start = alpha
+        best = -INFINITY
+        best_found = None
+        for index, move in enumerate(moves):
+            start, end, promotion = move
+            board.move(start, end, promotion or 'Q')
+            score = -self.negamax(other, depth - 1, -beta, -alpha, ply + 1)
+            board.undo_move()
+
+            if score > best:
+                best = score
+                best_found = move
+                if score > alpha:
+                    alpha = score
+                    # Triangular PV: this move followed by the child's line
+                    self.pv_table[ply][0] = move
+                    child_length = self.pv_length[ply + 1]
+                    self.pv_table[ply][1:child_length + 1] = self.pv_table[ply + 1][:child_length]
+                    self.pv_length[ply] = child_length + 1
+                    if alpha >= beta:
+                        self.orderer.record_cutoff(board, move, ply, depth, index)
+                        break
+
+        if best >= beta:
+            bound = LOWER
+        elif best > alpha_start:
+            bound = EXACT
+        else:
+            bound = UPPER
+        self.tt.store(key, depth, bound, score_to_tt(best, ply), best_found)
+        return best
+
+
+    def quiescence(self, turn, alpha, beta, ply):
+        # Resolve captures and promotions so leaves are never scored mid-exchange
+        self.nodes += 1
+        self.qnodes += 1
+        if self.nodes >= self.next_check:
+            self._check_limits()
+        self.pv_length[ply] = 0
+
+        board = self.board
+        moves = board.generate_legal_moves(turn)
+        if not moves:
+            if board.is_in_check(turn):
+                return -MATE_SCORE + ply
+            return 0
+
+        stand_pat = evaluate(board, turn)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        orderer = self.orderer
+        tactical = [move for move in moves
+                    if move[2] in (None, 'Q') and (move[2] or orderer.is_capture(board, move))]
+        other = 'b' if turn == 'w' else 'w'
+        for move in orderer.order_moves(board, tactical, ply):
+            if see(board, move) < 0:
+                self.see_pruned += 1  # Losing capture, skipped without making it
+                continue
+            start, end, promotion = move
+            board.move(start, end, promotion or 'Q')
+            score = -self.quiescence(other, -beta, -alpha, ply + 1)
+            board.undo_move()
+            if score > alpha:
+                if score >= beta:
+                    return score
+                alpha = score
+        return alpha
+
+
+def best_move(board, turn, limits=None, threads=1, tablebases=None):
+    """ Best move for `turn` within the given limits, or None if there is no legal move.
+    threads > 1 runs a Lazy SMP search with helper processes (see smp.py).
+    Every call starts a new searcher and table; a game should keep one searcher
+    for all its moves, as main.py and uci.py do. """
+    if threads > 1:
+        from smp import ParallelSearcher  # smp imports this module
+        with ParallelSearcher(board, threads=threads, tablebases=tablebases) as searcher:
+            return searcher.search(turn, limits).best_move
+    searcher = Searcher(board)
+    searcher.tablebases = tablebases
+    return searcher.search(turn, limits).best_move
@@ -0,0 +1,79 @@
+# Static exchange evaluation: the material outcome of the capture sequence on
+# one square when both sides always recapture with their cheapest attacker
+# and may stop whenever continuing would lose material. Built on
+# Board.square_attackers, with pieces lined up behind a capturer (x-rays)
+# joining the exchange once the piece in front has gone.
+
+SEE_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000}
+
+
+def _sign(x):
+    return (x > 0) - (x < 0)
+
+
+def _xray_attacker(board, square, target, removed):
+    # The first piece behind `square` on the line from `target`, if it is a
+    # slider that moves along that line
+    dr, dc = _sign(square[0] - target[0]), _sign(square[1] - target[1])
+    if square[0] - target[0] != 0 and square[1] - target[1] != 0 and \
+       abs(square[0] - target[0]) != abs(square[1] - target[1]):
+        return None  # Knight, not on a line
+    sliders = 'BQ' if dr and dc else 'RQ'
+    r, c = square[0] + dr, square[1] + dc
+    while 0 <= r < 8 and 0 <= c < 8:
+        piece = board.board[r][c]
+        if piece != "--" and (r, c) not in removed:
+            if piece[1] in sliders:
+                return (r, c)
+            return None
+        r += dr
+        c += dc
+    return None
+
+
+def see(board, move):
+    """ Expected material gain (centipawns) of `move` for the side making it """
+    start, end, promotion = move
+    piece = board.board[start[0]][start[1]]
+    target = board.board[end[0]][end[1]]
+    mover = piece[0]
+
+    if target != "--":
+        gain = [SEE_VALUES[target[1]]]
+    elif piece[1] == 'P' and start[1] != end[1]:
+        gain = [SEE_VALUES['P']]  # En passant
+    else:
+        gain = [0]
+
+    on_square = SEE_VALUES[piece[1]]
+    if promotion:
+        gain[0] += SEE_VALUES[promotion] - SEE_VALUES['P']
+        on_square = SEE_VALUES[promotion]
+
+    removed = {start}
+    attackers = {
+        'w': [sq for sq in board.square_attackers(end[0], end[1], 'w') if sq != start],
+        'b': [sq for sq in board.square_attackers(end[0], end[1], 'b') if sq != start],
+    }
+    behind = _xray_attacker(board, start, end, removed)
+    if behind is not None:
+        attackers[board.board[behind[0]][behind[1]][0]].append(behind)
+
+    side = 'b' if mover == 'w' else 'w'
+    while attackers[side]:
+        # Cheapest attacker recaptures
+        square = min(attackers[side], key=lambda sq: SEE_VALUES[board.board[sq[0]][sq[1]][1]])
+        attackers[side].remove(square)
+        removed.add(square)
+        gain.append(on_square - gain[-1])
+        on_square = SEE_VALUES[board.board[square[0]][square[1]][1]]
+
+        behind = _xray_attacker(board, square, end, removed)
+        if behind is not None:
+            attackers[board.board[behind[0]][behind[1]][0]].append(behind)
+        side = 'b' if side == 'w' else 'w'
+
+    # Each side may decline to continue the exchange
+    for i in range(len(gain) - 1, 0, -1):
+        gain[i - 1] = -max(-gain[i - 1], gain[i])
+    return gain[0]
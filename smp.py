@@ -0,0 +1,122 @@
+import os
+from multiprocessing import Event, Pool
+from multiprocessing.shared_memory import SharedMemory
+
+from bitboard import BitboardBoard
+from search import Searcher, SearchLimits, MAX_PLY
+from transposition import TranspositionTable, table_bytes
+from tablebase import Tablebases
+
+# Lazy SMP: the main searcher runs in this process while helper processes
+# search the same root position. Every searcher reads and writes one
+# transposition table in shared memory, so helpers fill it with results the
+# main search then picks up (and vice versa). Helpers are stopped as soon as
+# the main search finishes; only its result is reported.
+#
+#   with ParallelSearcher(board, threads=4) as searcher:
+#       result = searcher.search('w', SearchLimits(movetime=2.0))
+
+_worker = {}  # Per helper process: shared table and stop event
+
+
+def _init_worker(shm, hash_mb, stop_event, tablebase_dir):
+    _worker['shm'] = shm
+    _worker['tt'] = TranspositionTable(hash_mb, buffer=shm.buf)
+    _worker['stop'] = stop_event
+    _worker['tablebases'] = Tablebases(tablebase_dir) if tablebase_dir else None
+
+
+def position_snapshot(board, turn):
+    """ Picklable copy of the current position: its FEN plus the keys that still
+    count for repetitions """
+    history = board.key_history[max(len(board.key_history) - 1 - board.halfmove_clock, 0):]
+    return board.to_fen(turn), history
+
+
+def board_from_snapshot(snapshot):
+    fen, history = snapshot
+    board, _ = BitboardBoard.from_fen(fen)
+    board.key_history = list(history)
+    return board
+
+
+def _helper_search(snapshot, turn, depth, movetime, index, age):
+    board = board_from_snapshot(snapshot)
+    tt = _worker['tt']
+    tt.age = (age - 1) & 63  # Searcher.search advances it to the main search's age
+    searcher = Searcher(board, tt=tt)
+    searcher.stop_event = _worker['stop']
+    searcher.tablebases = _worker['tablebases']
+    # Odd helpers run one iteration ahead, so helpers and the main search
+    # are not all working on the same depth at once
+    result = searcher.search(turn, SearchLimits(depth=depth, movetime=movetime), first_depth=1 + index % 2)
+    return searcher.nodes, result.depth
+
+
+class ParallelSearcher:
+    def __init__(self, board, threads=None, hash_mb=16, max_threads=None, tablebases=None):
+        """ threads counts the main searcher plus helpers; it is capped by
+        max_threads (default: all cores). Helpers open the same tablebases. """
+        cores = max_threads or os.cpu_count() or 1
+        self.threads = max(1, min(threads or cores, cores))
+        self.board = board
+        self.hash_mb = hash_mb
+
+        self.shm = SharedMemory(create=True, size=table_bytes(hash_mb))
+        self.tt = TranspositionTable(hash_mb, buffer=self.shm.buf)
+        self.searcher = Searcher(board, tt=self.tt)
+        self.searcher.tablebases = tablebases
+        self.stop_event = Event()
+        self.pool = None
+        if self.threads > 1:
+            self.pool = Pool(self.threads - 1, initializer=_init_worker,
+                             initargs=(self.shm, hash_mb, self.stop_event,
+                                       tablebases.directory if tablebases else None))
+        self.nodes = 0          # Main + helper nodes of the last search
+        self.helper_depths = []
+
+    def stop(self):
+        self.searcher.stop()
+        self.stop_event.set()
+
+    def search(self, turn, limits=None):
+        limits = limits or SearchLimits()
+        self.stop_event.clear()
+        pending = []
+        if self.pool is not None:
+            snapshot = position_snapshot(self.board, turn)
+            age = (self.tt.age + 1) & 63  # The age the main search is about to use
+            depth = min(MAX_PLY, limits.depth + 1)
+            for index in range(self.threads - 1):
+                pending.append(self.pool.apply_async(
+                    _helper_search, (snapshot, turn, depth, limits.movetime, index + 1, age)))
+
+        result = self.searcher.search(turn, limits)
+
+        self.stop_event.set()
+        helper_results = [job.get() for job in pending]
+        self.stop_event.clear()
+        self.nodes = result.nodes + sum(nodes for nodes, _ in helper_results)
+        self.helper_depths = [depth for _, depth in helper_results]
+        return result
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.shm is not None:
+            # Views into the block must go before it can be closed
+            self.searcher = None
+            self.tt.words.release()
+            self.tt.raw.release()
+            self.tt = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,312 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from Board import Board
+
+# Endgame tablebases for king + one piece against a lone king (KQK, KRK,
+# KPK), generated by retrograde analysis on top of Board's move rules.
+#
+#   python tablebase.py KQK KRK KPK --dir tablebases
+#
+# Every position with White holding the extra piece is one byte of a
+# <set>.ctb file at index ((side * 64 + white king) * 64 + black king) * 64 + piece,
+# squares as row * 8 + col. The byte packs the result for the side to move:
+#   bits 6-7: 0 draw (or illegal position), 1 win, 2 loss
+#   bits 0-5: distance to mate in moves
+# so a probe is one read from the memory-mapped file. Positions where Black
+# has the piece are probed with colours swapped.
+
+MAGIC = b'CTB1'
+HEADER = struct.Struct('<4s4sI4x')
+SIZE = 2 * 64 * 64 * 64
+
+DRAW, WIN, LOSS = 0, 1, 2
+UNREACHED = 0x7FFF
+
+PIECE_SETS = ['KQK', 'KRK', 'KPK']
+DEPENDENCIES = {'KPK': ['KQK', 'KRK']}  # Tables a pawn can promote into
+
+
+def position_index(side, white_king, black_king, piece):
+    return ((side * 64 + white_king) * 64 + black_king) * 64 + piece
+
+
+def encode(state, plies):
+    if state == WIN:
+        return (WIN << 6) | ((plies + 1) // 2)
+    if state == LOSS:
+        return (LOSS << 6) | (plies // 2)
+    return 0
+
+
+def decode(value):
+    """ (wdl, plies) for the side to move: wdl 1 win, 0 draw, -1 loss; plies until mate """
+    state, moves = value >> 6, value & 63
+    if state == WIN:
+        return 1, 2 * moves - 1
+    if state == LOSS:
+        return -1, 2 * moves
+    return 0, 0
+
+
+def _empty_board():
+    board = Board(8, 8, 0, 0, load_images=False)
+    board.board = [["--"] * 8 for _ in range(8)]
+    board.sync_attack_maps()
+    board.castling_rights = 0
+    board.en_passant_possible = ()
+    return board
+
+
+def generate(pieces, promoted=None, progress=None):
+    """ Table for `pieces` ('KQK', 'KRK' or 'KPK') as a bytearray of encoded
+    results. KPK needs the KQK and KRK tables in `promoted` ({'Q': ..., 'R': ...}). """
+    kind = pieces[1]
+    piece = 'w' + kind
+    promoted = promoted or {}
+    board = _empty_board()
+
+    # Pass 1: walk every legal position once with Board's move generator and
+    # record its successors. Moves that leave the table (captures, promotions)
+    # are resolved on the spot from the target's known result.
+    offsets = array('I', [0]) * (SIZE + 1)
+    successors = array('I')
+    win_plies = array('h', [UNREACHED]) * SIZE   # Best known win for the side to move
+    max_win = array('h', [-1]) * SIZE            # Longest opponent win seen so far
+    blocked = bytearray(SIZE)                    # A drawing move exists, never lost
+    legal = bytearray(SIZE)
+    mates = []
+
+    for side, turn, other in ((0, 'w', 'b'), (1, 'b', 'w')):
+        if progress:
+            progress(f"{pieces}: generating moves, {'white' if side == 0 else 'black'} to move")
+        for wk in range(64):
+            board.set_square(wk // 8, wk % 8, 'wK')
+            board.white_king_location = (wk // 8, wk % 8)
+            for bk in range(64):
+                if bk == wk or (abs(bk // 8 - wk // 8) <= 1 and abs(bk % 8 - wk % 8) <= 1):
+                    continue
+                board.set_square(bk // 8, bk % 8, 'bK')
+                board.black_king_location = (bk // 8, bk % 8)
+                for sq in range(64):
+                    if sq == wk or sq == bk or (kind == 'P' and sq // 8 in (0, 7)):
+                        continue
+                    board.set_square(sq // 8, sq % 8, piece)
+                    index = position_index(side, wk, bk, sq)
+                    # The side that just moved cannot have left its king in check
+                    if not board.is_in_check(other):
+                        legal[index] = 1
+                        _record_moves(board, turn, side, wk, bk, sq, kind, index, promoted,
+                                      successors, win_plies, max_win, blocked, mates)
+                    offsets[index + 1] = len(successors)
+                    board.set_square(sq // 8, sq % 8, "--")
+                board.set_square(bk // 8, bk % 8, "--")
+            board.set_square(wk // 8, wk % 8, "--")
+    for index in range(SIZE):
+        if offsets[index + 1] < offsets[index]:
+            offsets[index + 1] = offsets[index]  # Skipped (illegal) indices own no successors
+
+    # Pass 2: invert the successor lists into predecessor lists
+    if progress:
+        progress(f"{pieces}: inverting {len(successors)} moves")
+    remaining = array('H', [0]) * SIZE
+    pred_offsets = array('I', [0]) * (SIZE + 1)
+    for target in successors:
+        pred_offsets[target + 1] += 1
+    for index in range(SIZE):
+        pred_offsets[index + 1] += pred_offsets[index]
+        remaining[index] = offsets[index + 1] - offsets[index]
+    predecessors = array('I', [0]) * len(successors)
+    fill = array('I', pred_offsets)
+    for index in range(SIZE):
+        for i in range(offsets[index], offsets[index + 1]):
+            target = successors[i]
+            predecessors[fill[target]] = index
+            fill[target] += 1
+    del successors, fill
+
+    # Pass 3: retrograde propagation, in order of distance to mate. A position
+    # is won as soon as one successor is lost for the opponent, and lost once
+    # every successor is won for the opponent.
+    buckets = [[] for _ in range(256)]
+    buckets[0] = mates
+    for index in range(SIZE):
+        if not legal[index]:
+            continue
+        if win_plies[index] != UNREACHED:
+            buckets[win_plies[index]].append(index)
+        elif remaining[index] == 0 and max_win[index] >= 0 and not blocked[index]:
+            buckets[max_win[index] + 1].append(index)  # Every move leaves the table into a loss
+
+    if progress:
+        progress(f"{pieces}: propagating")
+    state = bytearray(SIZE)
+    plies = array('h', [0]) * SIZE
+    for level in range(len(buckets) - 1):
+        for index in buckets[level]:
+            if state[index]:
+                continue
+            won = win_plies[index] == level
+            state[index] = WIN if won else LOSS
+            plies[index] = level
+            for i in range(pred_offsets[index], pred_offsets[index + 1]):
+                pred = predecessors[i]
+                if state[pred]:
+                    continue
+                if not won:
+                    if level + 1 < win_plies[pred]:
+                        win_plies[pred] = level + 1
+                        buckets[level + 1].append(pred)
+                else:
+                    remaining[pred] -= 1
+                    if level > max_win[pred]:
+                        max_win[pred] = level
+                    if remaining[pred] == 0 and not blocked[pred] and win_plies[pred] == UNREACHED:
+                        buckets[max_win[pred] + 1].append(pred)
+
+    table = bytearray(SIZE)
+    for index in range(SIZE):
+        if state[index]:
+            table[index] = encode(state[index], plies[index])
+    return table
+
+
+def _record_moves(board, turn, side, wk, bk, sq, kind, index, promoted,
+                  successors, win_plies, max_win, blocked, mates):
+    moves = board.generate_legal_moves(turn)
+    if not moves:
+        if board.is_in_check(turn):
+            mates.append(index)
+        return  # Stalemate stays a draw
+    for (start_row, start_col), (end_row, end_col), promotion in moves:
+        start, end = start_row * 8 + start_col, end_row * 8 + end_col
+        if turn == 'b':
+            if end == sq:
+                blocked[index] = 1  # King takes the piece: bare kings
+                continue
+            successors.append(position_index(0, wk, end, sq))
+        elif start == wk:
+            successors.append(position_index(1, end, bk, sq))
+        elif kind == 'P' and end_row == 0:
+            if promotion not in promoted:
+                blocked[index] = 1  # Minor piece promotion (or table missing): a draw
+                continue
+            result, distance = decode(promoted[promotion][position_index(1, wk, bk, end)])
+            if result < 0 and distance + 1 < win_plies[index]:
+                win_plies[index] = distance + 1
+            elif result > 0:
+                max_win[index] = max(max_win[index], distance)
+            elif result == 0:
+                blocked[index] = 1
+        else:
+            successors.append(position_index(1, wk, bk, end))
+
+
+def write_table(path, pieces, table):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, pieces.encode(), len(table)))
+        f.write(table)
+
+
+class Tablebases:
+    """ Memory-mapped .ctb tables found in `directory` """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = []
+        self.tables = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.ctb'):
+                continue
+            f = open(os.path.join(directory, name), 'rb')
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, pieces, count = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or count != SIZE:
+                data.close()
+                f.close()
+                continue
+            self.files.append((f, data))
+            self.tables[pieces.rstrip(b'\0').decode()[1]] = data
+
+    def probe(self, board, turn):
+        """ (wdl, plies) for the side to move, or None if no table covers the position """
+        found = []
+        for row in range(8):
+            for col in range(8):
+                piece = board.board[row][col]
+                if piece != "--" and piece[1] != 'K':
+                    found.append((piece, row, col))
+                    if len(found) > 1:
+                        return None
+        if not found:
+            return 0, 0  # Bare kings
+        piece, row, col = found[0]
+        if piece[1] in 'BN':
+            return 0, 0
+        data = self.tables.get(piece[1])
+        if data is None:
+            return None
+        if board.castling_rights:
+            return None  # Tables assume no castling
+
+        (wr, wc), (br, bc) = board.white_king_location, board.black_king_location
+        if piece[0] == 'w':
+            index = position_index(0 if turn == 'w' else 1, wr * 8 + wc, br * 8 + bc, row * 8 + col)
+        else:
+            # Swap colours: mirror the ranks so Black's piece becomes White's
+            index = position_index(0 if turn == 'b' else 1, (7 - br) * 8 + bc, (7 - wr) * 8 + wc,
+                                   (7 - row) * 8 + col)
+        return decode(data[HEADER.size + index])
+
+    def close(self):
+        for f, data in self.files:
+            data.close()
+            f.close()
+        self.files = []
+        self.tables = {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases by retrograde analysis")
+    parser.add_argument("sets", nargs="*", default=PIECE_SETS, help=f"piece sets ({', '.join(PIECE_SETS)})")
+    parser.add_argument("--dir", default="tablebases", help="output directory")
+    args = parser.parse_args(argv)
+
+    for pieces in args.sets:
+        if pieces not in PIECE_SETS:
+            parser.error(f"unknown piece set {pieces}")
+    os.makedirs(args.dir, exist_ok=True)
+
+    generated = {}
+
+    def build(pieces):
+        if pieces in generated:
+            return generated[pieces]
+        path = os.path.join(args.dir, pieces + '.ctb')
+        if os.path.exists(path) and pieces not in args.sets:
+            with open(path, 'rb') as f:
+                generated[pieces] = bytearray(f.read()[HEADER.size:])
+            return generated[pieces]
+        promoted = {name[1]: build(name) for name in DEPENDENCIES.get(pieces, [])}
+        start = time.perf_counter()
+        table = generate(pieces, promoted, progress=print)
+        write_table(path, pieces, table)
+        wins = sum(1 for value in table if value >> 6 == WIN)
+        longest = max(value & 63 for value in table if value >> 6 == WIN) if wins else 0
+        print(f"{pieces}: {wins} wins, longest mate {longest} moves, "
+              f"{time.perf_counter() - start:.1f}s -> {path}")
+        generated[pieces] = table
+        return table
+
+    for pieces in args.sets:
+        build(pieces)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import unittest
+
+from Board import Board, START_FEN
+from bitboard import BitboardBoard
+
+# Board.set_fen / to_fen. Run with `python -m unittest` or pytest.
+
+BAD_FENS = [
+    "8/8/8/8/8/8/8/K6k w KQkq e 0 1",            # En passant field too short
+    "4k3/8/8/8/8/8/8/4K3 w - z9 0 1",            # En passant off the board
+    "4k3/8/8/8/8/8/8/4K3 w - e9 0 1",
+    "4k3/8/8/8/8/8/8/4K3 w - e3 0 1",            # Wrong rank for the side to move
+    "4k3/8/8/3P4/8/8/8/4K3 w - e6 0 1",          # No black pawn on e5
+    "4k3/8/8/3Pn3/8/8/8/4K3 w - e6 0 1",         # A knight, not a pawn, on e5
+    "4k3/4p3/8/3Pp3/8/8/8/4K3 w - e6 0 1",       # e7 still occupied
+    "4k3/8/8/8/3p4/8/8/4K3 b - e3 0 1",          # No white pawn on e4
+    "4k3/4R3/8/8/8/8/8/4K3 w - - 0 1",           # Black, not to move, is in check
+    "4k3/8/8/8/8/8/4r3/4K3 b - - 0 1",           # White, not to move, is in check
+    "4k3/8/8/8/8/8/8/4KK2 w - - 0 1",            # Two white kings
+    "8/8/8/8/8/8/8/4K3 w - - 0 1",               # No black king
+    "P3k3/8/8/8/8/8/8/4K3 w - - 0 1",            # Pawn on the 8th rank
+    "4k3/8/8/8/8/8/8/p3K3 b - - 0 1",            # Pawn on the 1st rank
+    "4k3/8/8/8/8/8/8/4K3 w KX - 0 1",            # Unknown castling letter
+    "4k3/8/8/8/8/8/8/4K3 x - - 0 1",             # Bad side to move
+    "4k3/8/8/8/8/8/8/4K3 w - - x 1",             # Bad halfmove clock
+    "4k3/8/8/8/8/8/8/4K3 w - - 0 1 extra",       # Too many fields
+    "4k3/8/8/8/8/8/4K3 w - - 0 1",               # 7 ranks
+    "4k3/8/8/8/8/8/8/4K4 w - - 0 1",             # 9 files
+    "",
+]
+
+
+class SetFenTest(unittest.TestCase):
+    def test_round_trip(self):
+        for fen in (START_FEN,
+                    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+                    "r3k2r/8/8/8/8/8/8/R3K2R b Kq - 12 40"):
+            for backend in (Board, BitboardBoard):
+                board, turn = backend.from_fen(fen)
+                self.assertEqual(board.to_fen(turn), fen)
+
+    def test_en_passant_square(self):
+        board, _ = Board.from_fen("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2")
+        self.assertEqual(board.en_passant_possible, (2, 4))
+        board, turn = Board.from_fen("4k3/8/8/8/3pP3/8/8/4K3 b - e3 0 1")
+        self.assertIn(((4, 3), (5, 4), None), board.generate_legal_moves(turn))
+
+    def test_epd_fields_only(self):
+        board, turn = Board.from_fen("4k3/8/8/8/8/8/8/4K3 b -")
+        self.assertEqual(turn, 'b')
+        self.assertEqual(board.halfmove_clock, 0)
+
+    def test_side_to_move_in_check(self):
+        board, turn = Board.from_fen("4k3/4r3/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertEqual(board.game_status(turn), 'check')
+
+    def test_malformed_fields_raise_value_error(self):
+        for fen in BAD_FENS:
+            for backend in (Board, BitboardBoard):
+                with self.subTest(fen=fen, backend=backend.__name__):
+                    with self.assertRaises(ValueError):
+                        backend.from_fen(fen)
+
+    def test_bad_fen_keeps_position(self):
+        board, _ = Board.from_fen(START_FEN)
+        with self.assertRaises(ValueError):
+            board.set_fen(BAD_FENS[0])
+        self.assertEqual(board.to_fen('w'), START_FEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
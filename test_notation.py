@@ -0,0 +1,55 @@
+import unittest
+
+from Board import Board, START_FEN
+from bitboard import BitboardBoard
+from notation import IllegalMoveError, parse_san, parse_uci
+
+# notation.parse_uci / parse_san. Run with `python -m unittest` or pytest.
+
+PROMOTION_FEN = "8/4P3/8/8/8/8/k7/4K3 w - - 0 1"
+
+
+class ParseUciTest(unittest.TestCase):
+    def test_plain_move(self):
+        for backend in (Board, BitboardBoard):
+            board, turn = backend.from_fen(START_FEN)
+            self.assertEqual(parse_uci(board, turn, "e2e4"), ((6, 4), (4, 4), None))
+
+    def test_promotion(self):
+        board, turn = Board.from_fen(PROMOTION_FEN)
+        self.assertEqual(parse_uci(board, turn, "e7e8n"), ((1, 4), (0, 4), 'N'))
+        self.assertEqual(parse_uci(board, turn, "e7e8"), ((1, 4), (0, 4), 'Q'))
+
+    def test_promotion_suffix_on_other_moves(self):
+        for backend in (Board, BitboardBoard):
+            board, turn = backend.from_fen(START_FEN)
+            for text in ("e2e4q", "g1f3n"):
+                with self.subTest(text=text, backend=backend.__name__):
+                    with self.assertRaises(IllegalMoveError):
+                        parse_uci(board, turn, text)
+        board, turn = Board.from_fen(PROMOTION_FEN)
+        with self.assertRaises(IllegalMoveError):
+            parse_uci(board, turn, "e1d1q")  # King move from a position with a promotion
+
+    def test_illegal_and_unreadable(self):
+        board, turn = Board.from_fen(START_FEN)
+        for text in ("e2e5", "e7e5", "e2", "e2e4k", "i2i4"):
+            with self.subTest(text=text):
+                with self.assertRaises(IllegalMoveError):
+                    parse_uci(board, turn, text)
+
+
+class ParseSanTest(unittest.TestCase):
+    def test_promotion_suffix_on_other_moves(self):
+        board, turn = Board.from_fen(START_FEN)
+        with self.assertRaises(IllegalMoveError):
+            parse_san(board, turn, "e4=Q")
+        self.assertEqual(parse_san(board, turn, "e4"), ((6, 4), (4, 4), None))
+
+    def test_promotion(self):
+        board, turn = Board.from_fen(PROMOTION_FEN)
+        self.assertEqual(parse_san(board, turn, "e8=R+"), ((1, 4), (0, 4), 'R'))
+
+
+if __name__ == "__main__":
+    unittest.main()
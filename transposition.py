@@ -0,0 +1,155 @@
+# Fixed-size transposition table keyed by Board.zobrist_key.
+#
+# The table is one preallocated block of 64-bit words, so its memory use is
+# set once by size_mb and never grows. Every bucket holds two entries:
+#   slot 0: depth-preferred, only overwritten by an equal or deeper result
+#           (or by anything once it is left over from an earlier search)
+#   slot 1: always-replace, takes whatever slot 0 refused
+# Each entry is two words, (key ^ data, data). Storing the key XORed with the
+# data lets a probe reject entries whose two words were written by different
+# stores, which keeps the table safe to share between processes without locks.
+
+EXACT, LOWER, UPPER = 1, 2, 3   # Bound types (0 = empty)
+
+ENTRY_WORDS = 2
+BUCKET_ENTRIES = 2
+BUCKET_BYTES = ENTRY_WORDS * BUCKET_ENTRIES * 8
+
+MATE_BOUND = 90000  # Scores beyond this are mate scores and stored relative to the node
+
+PROMOTION_CODES = {None: 0, 'Q': 1, 'R': 2, 'B': 3, 'N': 4}
+PROMOTION_PIECES = [None, 'Q', 'R', 'B', 'N']
+
+
+def pack_move(move):
+    # (start, end, promotion) -> 15-bit int: from (6) | to (6) | promotion (3), 0 = no move
+    if move is None:
+        return 0
+    (start_row, start_col), (end_row, end_col), promotion = move
+    return (start_row * 8 + start_col) | ((end_row * 8 + end_col) << 6) | (PROMOTION_CODES[promotion] << 12)
+
+
+def unpack_move(code):
+    if code == 0:
+        return None
+    start, end = code & 63, (code >> 6) & 63
+    return ((start // 8, start % 8), (end // 8, end % 8), PROMOTION_PIECES[(code >> 12) & 7])
+
+
+# data word: move (16) | score + 2^31 (32) | depth (8) | bound (2) | age (6)
+def _pack_data(move_code, score, depth, bound, age):
+    return move_code | ((score + (1 << 31)) << 16) | (depth << 48) | (bound << 56) | (age << 58)
+
+
+def score_to_tt(score, ply):
+    # Mate scores count plies from the root; store them counted from this node
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def table_bytes(size_mb):
+    # Bytes actually used for size_mb: a power-of-two number of buckets
+    buckets = max(1, (size_mb * 1024 * 1024) // BUCKET_BYTES)
+    return (1 << (buckets.bit_length() - 1)) * BUCKET_BYTES
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16, buffer=None):
+        """ size_mb is rounded down to a power-of-two bucket count. Pass `buffer`
+        (any writable buffer, e.g. shared memory) to use existing storage. """
+        size = table_bytes(size_mb)
+        self.bucket_count = size // BUCKET_BYTES
+        self.mask = self.bucket_count - 1
+        if buffer is None:
+            buffer = bytearray(size)
+        self.raw = memoryview(buffer)[:size]
+        self.words = self.raw.cast('Q')
+        self.age = 0
+        self.reset_stats()
+
+    @property
+    def size_bytes(self):
+        return self.bucket_count * BUCKET_BYTES
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0  # Misses where the bucket held other positions
+        self.stores = 0
+
+    def clear(self):
+        self.raw[:] = bytes(len(self.raw))
+        self.age = 0
+
+    def new_search(self):
+        # Entries from earlier searches lose their depth-preferred protection
+        self.age = (self.age + 1) & 63
+
+    def probe(self, key):
+        """ (depth, bound, score, move) stored for key, or None """
+        self.probes += 1
+        words = self.words
+        base = (key & self.mask) * 4
+        occupied = False
+        for index in (base, base + 2):
+            data = words[index + 1]
+            if data:
+                if words[index] ^ data == key:
+                    self.hits += 1
+                    return ((data >> 48) & 0xFF, (data >> 56) & 3,
+                            ((data >> 16) & 0xFFFFFFFF) - (1 << 31), unpack_move(data & 0xFFFF))
+                occupied = True
+        self.misses += 1
+        if occupied:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        self.stores += 1
+        words = self.words
+        base = (key & self.mask) * 4
+        move_code = pack_move(move)
+
+        old = words[base + 1]
+        same_key = old and words[base] ^ old == key
+        if not old or same_key or depth >= (old >> 48) & 0xFF or (old >> 58) != self.age:
+            if same_key and not move_code:
+                move_code = old & 0xFFFF  # Keep the known best move
+            index = base
+        else:
+            index = base + 2
+        data = _pack_data(move_code, score, max(0, min(depth, 255)), bound, self.age)
+        words[index] = key ^ data
+        words[index + 1] = data
+
+    def hashfull(self):
+        """ Permille of depth-preferred slots filled in the current search (UCI style) """
+        sample = min(1000, self.bucket_count)
+        used = 0
+        for bucket in range(sample):
+            data = self.words[bucket * 4 + 1]
+            if data and (data >> 58) == self.age:
+                used += 1
+        return used * 1000 // sample
+
+    def stats(self):
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+        }
@@ -0,0 +1,247 @@
+import os
+import sys
+import threading
+
+from Board import START_FEN
+from bitboard import BitboardBoard
+from notation import move_to_uci, parse_uci
+from search import Searcher, SearchLimits, MATE_SCORE, MATE_THRESHOLD, MAX_PLY
+
+# Headless UCI engine: no window, mixer or sprites.
+#
+#   python uci.py
+#
+# Commands are read on the main thread while `go` searches on a worker thread,
+# so `isready` and `stop` are answered at once even in the middle of a search.
+
+ENGINE_NAME = "Chess-Game"
+ENGINE_AUTHOR = "Mayankarjoriya"
+
+MOVE_OVERHEAD = 0.05  # Seconds kept back per move for the GUI and process latency
+
+
+class UCIEngine:
+    def __init__(self, output=None):
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.board = BitboardBoard(8, 8, 800, 800, load_images=False)
+        self.turn = self.board.set_fen(START_FEN)
+        self.hash_mb = 16
+        self.threads = 1
+        self.tablebase_path = ""
+        self.book_file = ""
+        self.tablebases = None
+        self.book = None
+        self.searcher = None
+        self.search_thread = None
+        self.infinite_done = threading.Event()  # Lets a finished `go infinite` wait for `stop`
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def run(self, stream=None):
+        stream = stream or sys.stdin
+        while True:
+            line = stream.readline()
+            if not line or not self.handle(line):
+                break
+        self.stop()
+        self.close()
+
+    def handle(self, line):
+        """ Process one command line; returns False on quit """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("option name Hash type spin default 16 min 1 max 4096")
+            self.send(f"option name Threads type spin default 1 min 1 max {os.cpu_count() or 1}")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("option name BookFile type string default <empty>")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'setoption':
+            self.stop()
+            self.set_option(args)
+        elif command == 'ucinewgame':
+            self.stop()
+            self.close_searcher()
+        elif command == 'position':
+            self.stop()
+            self.set_position(args)
+        elif command == 'go':
+            self.stop()
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            return False
+        elif command == 'd':
+            self.send(self.board.to_fen(self.turn))
+        # Anything else (debug, register, ponderhit, unknown) is ignored, as the protocol asks
+        return True
+
+    def set_option(self, args):
+        # setoption name <id> [value <x>]
+        if 'name' not in args:
+            return
+        value_at = args.index('value') if 'value' in args else len(args)
+        name = " ".join(args[args.index('name') + 1:value_at]).lower()
+        value = " ".join(args[value_at + 1:])
+        if value == '<empty>':
+            value = ""
+        try:
+            if name == 'hash':
+                self.hash_mb = max(1, int(value))
+                self.close_searcher()
+            elif name == 'threads':
+                self.threads = max(1, min(int(value), os.cpu_count() or 1))
+                self.close_searcher()
+            elif name == 'tablebasepath':
+                self.tablebase_path = value
+                self.close_searcher()
+            elif name == 'bookfile':
+                self.book_file = value
+                if self.book is not None:
+                    self.book.close()
+                    self.book = None
+        except ValueError:
+            self.send(f"info string bad value {value!r} for {name}")
+
+    def set_position(self, args):
+        # position [startpos | fen <fen>] [moves <m1> <m2> ...]
+        moves_at = args.index('moves') if 'moves' in args else len(args)
+        if args and args[0] == 'fen':
+            fen = " ".join(args[1:moves_at])
+        else:
+            fen = START_FEN
+        turn = self.turn
+        try:
+            turn = self.board.set_fen(fen)
+            for text in args[moves_at + 1:]:
+                start, end, promotion = parse_uci(self.board, turn, text)
+                self.board.move(start, end, promotion or 'Q')
+                turn = 'b' if turn == 'w' else 'w'
+        except ValueError as e:  # Bad FEN (position unchanged) or IllegalMoveError (moves so far kept)
+            self.send(f"info string {e}")
+        self.turn = turn
+
+    def go(self, args):
+        limits, infinite = self.limits(args)
+        if not infinite and self.book_file:
+            move = self.book_move()
+            if move is not None:
+                self.send(f"bestmove {move_to_uci(move)}")
+                return
+        searcher = self.get_searcher()
+        self.infinite_done.clear()
+        self.search_thread = threading.Thread(target=self._search, args=(searcher, limits, infinite), daemon=True)
+        self.search_thread.start()
+
+    def limits(self, args):
+        """ (SearchLimits, infinite) for the arguments of `go` """
+        params = {}
+        for index, token in enumerate(args[:-1]):
+            if token in ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'movetime', 'depth', 'nodes'):
+                try:
+                    params[token] = int(args[index + 1])
+                except ValueError:
+                    pass
+        infinite = 'infinite' in args
+        limits = SearchLimits(depth=min(params.get('depth', MAX_PLY), MAX_PLY), nodes=params.get('nodes'))
+        if 'movetime' in params:
+            limits.movetime = max(params['movetime'] / 1000 - MOVE_OVERHEAD, 0.01)
+        elif not infinite and ('wtime' in params or 'btime' in params):
+            left = params.get(self.turn + 'time', 0) / 1000
+            increment = params.get(self.turn + 'inc', 0) / 1000
+            moves_to_go = params.get('movestogo', 30)
+            budget = left / max(moves_to_go, 1) + increment * 0.75
+            limits.movetime = max(min(budget, left / 2) - MOVE_OVERHEAD, 0.01)
+        return limits, infinite
+
+    def get_searcher(self):
+        # One searcher (and transposition table) is kept across moves of a game
+        if self.searcher is None:
+            if self.tablebase_path and self.tablebases is None:
+                from tablebase import Tablebases
+                try:
+                    self.tablebases = Tablebases(self.tablebase_path)
+                except OSError as e:
+                    self.send(f"info string cannot open tablebases: {e}")
+                    self.tablebase_path = ""
+            if self.threads > 1:
+                from smp import ParallelSearcher
+                self.searcher = ParallelSearcher(self.board, threads=self.threads, hash_mb=self.hash_mb,
+                                                 tablebases=self.tablebases)
+                self.searcher.searcher.on_iteration = self.send_info
+            else:
+                self.searcher = Searcher(self.board, hash_mb=self.hash_mb)
+                self.searcher.tablebases = self.tablebases
+                self.searcher.on_iteration = self.send_info
+        return self.searcher
+
+    def book_move(self):
+        if self.book is None:
+            from polyglot import OpeningBook
+            try:
+                self.book = OpeningBook(self.book_file)
+            except OSError as e:
+                self.send(f"info string cannot open book: {e}")
+                self.book_file = ""
+                return None
+        return self.book.weighted_choice(self.board, self.turn)
+
+    def _search(self, searcher, limits, infinite):
+        result = searcher.search(self.turn, limits)
+        if infinite:
+            self.infinite_done.wait()  # bestmove only after `stop`
+        move = move_to_uci(result.best_move) if result.best_move else "0000"
+        self.send(f"bestmove {move}")
+
+    def send_info(self, result):
+        if abs(result.score) >= MATE_THRESHOLD:
+            plies = MATE_SCORE - abs(result.score)
+            score = f"mate {(plies + 1) // 2 if result.score > 0 else -(plies // 2)}"
+        else:
+            score = f"cp {result.score}"
+        elapsed = max(result.time, 1e-6)
+        pv = " ".join(move_to_uci(move) for move in result.pv)
+        self.send(f"info depth {result.depth} score {score} nodes {result.nodes} "
+                  f"nps {int(result.nodes / elapsed)} time {int(result.time * 1000)} pv {pv}")
+
+    def stop(self):
+        """ End a running search; its bestmove is sent before this returns """
+        if self.search_thread is not None:
+            self.searcher.stop()
+            self.infinite_done.set()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def close_searcher(self):
+        if self.searcher is not None and hasattr(self.searcher, 'close'):
+            self.searcher.close()
+        self.searcher = None
+        if self.tablebases is not None:
+            self.tablebases.close()
+            self.tablebases = None
+
+    def close(self):
+        self.close_searcher()
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+
+
+def main():
+    UCIEngine().run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
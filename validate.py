@@ -0,0 +1,188 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from Board import START_FEN
+from notation import IllegalMoveError, parse_uci
+from perft import BACKENDS
+from pgn import RESULTS, PGNError, read_games, replay
+
+# Bulk game validation: replays stored games through the rules engine and
+# reports every illegal move.
+#
+#   python validate.py games.pgn --jobs 8
+#   python validate.py client_games.txt       # one game per line of UCI moves
+#
+# A UCI game line is "[startpos | fen <fen>] [moves] e2e4 e7e5 ... [result]".
+# Files are cut into byte ranges that worker processes read on their own, so
+# only file offsets go out and small per-shard summaries come back. Each
+# worker replays one game at a time on a single reused headless board.
+
+MAX_ERRORS = 20  # Illegal games described per shard and in the report; the rest are only counted
+
+
+def shards(path, chunk_bytes):
+    """ (path, start, end) byte ranges covering the file """
+    size = os.path.getsize(path)
+    return [(path, start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)] or [(path, 0, 0)]
+
+
+def _line_before(f, pos):
+    # The line that ends at `pos` (only its start matters, so 512 bytes will do)
+    begin = max(0, pos - 512)
+    f.seek(begin)
+    data = f.read(pos - begin).rstrip(b'\r\n')
+    return data[data.rfind(b'\n') + 1:]
+
+
+def shard_lines(path, start, end, pgn):
+    """ Decoded lines of the games that begin inside [start, end) of the file.
+    A PGN game begins at a tag line that does not follow another tag line; a
+    UCI game is one line. A game running past `end` is read to its last line. """
+    with open(path, 'rb') as f:
+        pos = start
+        if start:
+            f.seek(start - 1)
+            f.readline()  # The line under way at `start` belongs to the shard before
+            pos = f.tell()
+        previous = _line_before(f, pos) if pgn and pos else b""
+        f.seek(pos)
+        owned = pos == 0 or not pgn
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            game_start = pgn and line[:1] == b'[' and previous[:1] != b'['
+            if pos >= end and (game_start or not pgn):
+                return
+            if game_start:
+                owned = True
+            if owned:
+                yield line.decode('utf-8', errors='replace')
+            previous = line
+            pos += len(line)
+
+
+def uci_games(lines):
+    """ Yield (fen, moves, result) for each UCI game line """
+    for line in lines:
+        tokens = line.split()
+        if not tokens or tokens[0].startswith('#'):
+            continue
+        fen = START_FEN
+        if tokens[0] == 'startpos':
+            tokens = tokens[1:]
+        elif tokens[0] == 'fen':
+            split = tokens.index('moves') if 'moves' in tokens else len(tokens)
+            fen = " ".join(tokens[1:split])
+            tokens = tokens[split:]
+        if tokens and tokens[0] == 'moves':
+            tokens = tokens[1:]
+        result = '*'
+        if tokens and tokens[-1] in RESULTS:
+            result = tokens.pop()
+        yield fen, tokens, result
+
+
+def _replay_uci(board, fen, moves):
+    turn = board.set_fen(fen)
+    for number, text in enumerate(moves):
+        try:
+            start, end, promotion = parse_uci(board, turn, text)
+        except IllegalMoveError as e:
+            raise PGNError(f"{e} at ply {number + 1}") from None
+        board.move(start, end, promotion or 'Q')
+        turn = 'b' if turn == 'w' else 'w'
+    return turn
+
+
+def _validate_shard(task):
+    # Worker entry point: replay every game of one shard and return counts only
+    path, start, end, backend = task
+    pgn = path.lower().endswith('.pgn')
+    board = BACKENDS[backend](8, 8, 800, 800, load_images=False)
+    summary = {'games': 0, 'plies': 0, 'illegal': 0, 'mismatched': 0, 'results': Counter(), 'errors': []}
+    lines = shard_lines(path, start, end, pgn)
+
+    if pgn:
+        games = ((game.headers, game.result, game) for game in read_games(lines))
+    else:
+        games = (({}, result, (fen, moves)) for fen, moves, result in uci_games(lines))
+    for headers, result, game in games:
+        summary['games'] += 1
+        summary['results'][result] += 1
+        try:
+            if pgn:
+                board, turn = replay(game, board)
+            else:
+                turn = _replay_uci(board, *game)
+        except ValueError as e:  # PGNError, or a bad FEN tag
+            summary['illegal'] += 1
+            if len(summary['errors']) < MAX_ERRORS:
+                name = " ".join(headers[tag] for tag in ('White', 'Black', 'Date', 'Round') if tag in headers)
+                summary['errors'].append(f"{path} @{start} game {summary['games']}{' (' + name + ')' if name else ''}: {e}")
+            continue
+        summary['plies'] += len(board.move_log)
+        # A game that ends in mate or stalemate has only one correct result
+        status = board.game_status(turn)
+        if status in ('checkmate', 'stalemate'):
+            expected = '1/2-1/2' if status == 'stalemate' else ('0-1' if turn == 'w' else '1-0')
+            if result != expected:
+                summary['mismatched'] += 1
+    return summary
+
+
+def validate(paths, jobs=1, backend='bitboard', chunk_mb=8.0, progress=None):
+    """ Combined summary (games, plies, illegal, mismatched, results, errors, time) for the files """
+    tasks = [shard + (backend,) for path in paths for shard in shards(path, max(int(chunk_mb * (1 << 20)), 1))]
+    total = {'games': 0, 'plies': 0, 'illegal': 0, 'mismatched': 0, 'results': Counter(), 'errors': []}
+    t0 = time.perf_counter()
+
+    def add(summary):
+        for key in ('games', 'plies', 'illegal', 'mismatched'):
+            total[key] += summary[key]
+        total['results'].update(summary['results'])
+        total['errors'].extend(summary['errors'])
+        if progress:
+            elapsed = time.perf_counter() - t0
+            progress(f"{total['games']} games  {total['illegal']} illegal  "
+                     f"{total['games'] / elapsed if elapsed > 0 else 0:,.0f} games/s")
+
+    if jobs > 1 and len(tasks) > 1:
+        with Pool(min(jobs, len(tasks))) as pool:
+            for summary in pool.imap_unordered(_validate_shard, tasks):
+                add(summary)
+    else:
+        for task in tasks:
+            add(_validate_shard(task))
+    total['time'] = time.perf_counter() - t0
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay stored games and report illegal moves")
+    parser.add_argument("files", nargs="+", help=".pgn files, or text files with one UCI game per line")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default='bitboard')
+    parser.add_argument("--chunk-mb", type=float, default=8.0, help="size of the file ranges handed to workers")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    args = parser.parse_args(argv)
+
+    total = validate(args.files, args.jobs, args.backend, args.chunk_mb, progress=None if args.quiet else print)
+    for error in total['errors'][:MAX_ERRORS]:
+        print(error)
+    if len(total['errors']) > MAX_ERRORS:
+        print(f"... and {total['illegal'] - MAX_ERRORS} more illegal games")
+    rate = total['games'] / total['time'] if total['time'] > 0 else 0
+    results = "  ".join(f"{result} {total['results'][result]}" for result in RESULTS if total['results'][result])
+    print(f"\ngames {total['games']}  plies {total['plies']}  illegal {total['illegal']}  "
+          f"result mismatches {total['mismatched']}  time {total['time']:.2f}s  {rate:,.0f} games/s")
+    print(f"results  {results}")
+    return 1 if total['illegal'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import random
+
+# Zobrist keys: one random 64-bit number per (piece, square), per castling
+# rights combination, per en passant file and for black to move. A position's
+# key is the XOR of the numbers for everything present, so a move only has to
+# XOR out what changed and XOR in what is new.
+
+_rng = random.Random(0x5EED)  # Fixed seed, keys must be identical across processes and runs
+
+PIECE_KEYS = {
+    color + kind: [_rng.getrandbits(64) for _ in range(64)]
+    for color in 'wb' for kind in 'KQRBNP'
+}
+CASTLING_KEYS = [_rng.getrandbits(64) for _ in range(16)]  # Indexed by Board.castling_rights
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+BLACK_TO_MOVE_KEY = _rng.getrandbits(64)
+
+
+def en_passant_key(board, turn):
+    # Only hashed when `turn` can actually capture, otherwise two identical
+    # positions would get different keys after any double pawn push
+    if not board.en_passant_possible:
+        return 0
+    row, col = board.en_passant_possible
+    pawn_row = row + 1 if turn == 'w' else row - 1
+    pawn = turn + 'P'
+    if (col > 0 and board.board[pawn_row][col - 1] == pawn) or \
+       (col < 7 and board.board[pawn_row][col + 1] == pawn):
+        return EN_PASSANT_KEYS[col]
+    return 0
+
+
+def compute_hash(board, turn):
+    """ Full key for the position from scratch (used to seed and to verify the incremental key) """
+    key = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece != "--":
+                key ^= PIECE_KEYS[piece][row * 8 + col]
+    key ^= CASTLING_KEYS[board.castling_rights]
+    key ^= en_passant_key(board, turn)
+    if turn == 'b':
+        key ^= BLACK_TO_MOVE_KEY
+    return key